@@ -20,13 +20,21 @@ FONCTIONNALITES:
 
 import os
 import json
-import glob
+import multiprocessing
 import re
 import sys
+from bisect import bisect_left, bisect_right
 from datetime import datetime, timedelta
 from collections import defaultdict
+from functools import lru_cache
+from operator import itemgetter
 from openpyxl import load_workbook
 
+try:
+    import orjson  # Parseur JSON rapide (optionnel, repli sur json)
+except ImportError:
+    orjson = None
+
 # =============================================================================
 # IMPORT DES LISTES OFFICIELLES OPC
 # =============================================================================
@@ -41,6 +49,7 @@ from listes_completes_v2 import (
     COMMERCES_SERVICES,
     categoriser_transaction,
     est_preteur,
+    contient_preteur_majuscules,
     est_a_exclure,
     est_assurance,
     est_syndic,
@@ -61,7 +70,7 @@ EXCEL_FILE = os.path.join(SCRIPT_DIR, "tableau_paiements.xlsx")
 # =============================================================================
 
 # Mots-cles suspects indiquant un preteur (+30 points)
-KEYWORDS_PRETEUR = [
+KEYWORDS_PRETEUR = (
     # Francais
     "PRET", "PRÊT", "EMPRUNT", "AVANCE", "CREDIT", "CRÉDIT",
     "FINANCE", "FINANCIERE", "FINANCIÈRE", "FINANCEMENT",
@@ -71,24 +80,24 @@ KEYWORDS_PRETEUR = [
     "MONEY", "FAST", "QUICK", "INSTANT", "PAYDAY",
     # Prefixes transactions
     "PMT", "PAYMENT", "PAIEMENT", "VIR", "VIREMENT", "TRANSFER"
-]
+)
 
-# Montants ronds suspects (+15 points)
-MONTANTS_SUSPECTS = [
+# Montants ronds suspects (+15 points) - frozenset: test d'appartenance O(1)
+MONTANTS_SUSPECTS = frozenset([
     100, 150, 200, 250, 300, 400, 500,
     750, 1000, 1500, 2000, 2500, 3000,
     4000, 5000
-]
+])
 
 # Prefixes bancaires suspects (+10 points)
-PREFIXES_SUSPECTS = [
+PREFIXES_SUSPECTS = (
     "PMT", "PAIEMENT", "PAYMENT",
     "VIR", "VIREMENT", "TRANSFER",
     "RETRAIT", "WITHDRAWAL", "DEBIT"
-]
+)
 
 # Mots indiquant NON-preteur (-40 points)
-NON_PRETEUR_KEYWORDS = [
+NON_PRETEUR_KEYWORDS = (
     # Salaire
     "SALAIRE", "SALARY", "PAIE", "PAYROLL", "WAGES",
     "REMUNERATION", "RÉMUNÉRATION",
@@ -105,28 +114,51 @@ NON_PRETEUR_KEYWORDS = [
     "PENSION", "RETIREMENT",
     # Ventes
     "VENTE", "SALE", "SOLD", "REFUND"
-]
+)
 
 # Descriptions trop generiques
-GENERIC_DESCRIPTIONS = [
+GENERIC_DESCRIPTIONS = frozenset([
     "TRANSFER", "VIREMENT", "PAYMENT", "PAIEMENT",
     "DEBIT", "CREDIT", "RETRAIT", "DEPOT"
-]
+])
+
+# Triple combinaison (Regle F): prefixes et mots-cles concernes
+PREFIXES_COMBINAISON = ("PMT", "VIR")
+KEYWORDS_COMBINAISON = ("CREDIT", "LOAN", "FINANCE", "PRET")
 
 # Mots-cles paie (pour detection revenu)
-PAYROLL_KEYWORDS = [
+PAYROLL_KEYWORDS = (
     "PAIE", "PAYROLL", "SALARY", "SALAIRE", "PAY", "WAGE",
     "DIRECT DEPOSIT", "DEPOT DIRECT", "REMUNERATION"
-]
+)
 
 # Mots-cles SAR
-SAR_KEYWORDS = ["SAR", "SOLUTION ARGENT", "ARGENT RAPIDE"]
+SAR_KEYWORDS = ("SAR", "SOLUTION ARGENT", "ARGENT RAPIDE")
+
+# Regex pre-compilees pour le scoring (une seule passe C par description).
+# Non-preteurs et mots-cles suspects dans une seule regex etiquetee: la
+# recherche anticipee (?=...) teste chaque position, un mot-cle ne peut donc
+# pas masquer un mot non-preteur qui chevauche (ex: LOANS + SALE).
+_RE_MOTS_CLES_SCORING = re.compile(
+    '(?=(?:(?P<non>'
+    + '|'.join(re.escape(kw) for kw in sorted(NON_PRETEUR_KEYWORDS, key=len, reverse=True))
+    + ')|(?P<kw>'
+    + '|'.join(re.escape(kw) for kw in sorted(KEYWORDS_PRETEUR, key=len, reverse=True))
+    + ')))'
+)
+# Mot-cle le plus long trouve a une position -> mots-cles qui en sont prefixes
+_KEYWORDS_PREFIXES = {
+    kw: frozenset(autre for autre in KEYWORDS_PRETEUR if kw.startswith(autre))
+    for kw in KEYWORDS_PRETEUR
+}
+# Ancree au debut et dans l'ordre de la liste: meme prefixe retenu que la boucle
+_RE_PREFIXES_SUSPECTS = re.compile('(?:' + '|'.join(re.escape(p) for p in PREFIXES_SUSPECTS) + ')')
 
 # =============================================================================
 # EXCLUSIONS: Casinos, gambling et services non-prêteurs
 # =============================================================================
 
-EXCLUSIONS_GAMBLING = [
+EXCLUSIONS_GAMBLING = (
     'GIGADAT',
     'LOTO-QUEBEC',
     'LOTOQUEBEC',
@@ -139,9 +171,9 @@ EXCLUSIONS_GAMBLING = [
     'PLAYNOW',
     'BET',
     'GAMING'
-]
+)
 
-EXCLUSIONS_SERVICES_PAIEMENT = [
+EXCLUSIONS_SERVICES_PAIEMENT = (
     'LOONIO',
     'PAYPER',
     'KOHO',
@@ -149,9 +181,9 @@ EXCLUSIONS_SERVICES_PAIEMENT = [
     'QUESTRADE',
     'TANGERINE',
     'EQ BANK'
-]
+)
 
-EXCLUSIONS_AUTRES = [
+EXCLUSIONS_AUTRES = (
     'IGA',
     'METRO',
     'WALMART',
@@ -166,10 +198,10 @@ EXCLUSIONS_AUTRES = [
     'TIM HORTONS',
     'MCDONALD',
     'JEAN COUTU'
-]
+)
 
 # NOUVEAU: Patterns de transactions à exclure (pas des prêteurs)
-EXCLUSIONS_PATTERNS = [
+EXCLUSIONS_PATTERNS = (
     'BILL PAYMENT',
     'TRANSFERSBILL',
     'TRANSFERSTRANSFER',
@@ -196,7 +228,44 @@ EXCLUSIONS_PATTERNS = [
     'RQ PAYMENT',
     'MUNICIPAL',
     'SCHOOL TAXES'
+)
+
+# Toutes les exclusions hardcodées (calculé une seule fois au chargement)
+TOUTES_EXCLUSIONS = (
+    EXCLUSIONS_GAMBLING + EXCLUSIONS_SERVICES_PAIEMENT + EXCLUSIONS_AUTRES + EXCLUSIONS_PATTERNS
+)
+
+
+def _compiler_alternance(termes):
+    """
+    Compile une liste de termes en une seule regex d'alternance.
+
+    Les termes les plus longs passent en premier pour que le moteur regex
+    (implémenté en C) teste tous les termes en une seule passe sur le texte.
+    """
+    termes_tries = sorted(set(termes), key=len, reverse=True)
+    return re.compile('|'.join(re.escape(terme) for terme in termes_tries))
+
+
+# Regex pré-compilées: une seule passe au lieu d'une boucle `in` par pattern
+_RE_EXCLUSIONS_PATTERNS = _compiler_alternance(EXCLUSIONS_PATTERNS)
+_RE_TOUTES_EXCLUSIONS = _compiler_alternance(TOUTES_EXCLUSIONS)
+
+# Dépôts de paie (revenu mensuel): un seul search au lieu d'une boucle `in`
+_RE_PAYROLL = _compiler_alternance(PAYROLL_KEYWORDS)
+
+# Catégories Inverite exclues d'office (gambling, épicerie, essence, ATM...)
+CATEGORIES_GAMBLING = ['gambling', 'casino']
+CATEGORIES_COURANTES = [
+    'groceries', 'gas', 'fuel', 'utilities', 'bills',
+    'insurance/car', 'insurance/life'
 ]
+CATEGORIES_EXCLUES = CATEGORIES_GAMBLING + CATEGORIES_COURANTES + ['atm']
+_RE_CATEGORIES_EXCLUES = _compiler_alternance(CATEGORIES_EXCLUES)
+
+# Mots-clés prêteurs qui empêchent l'exclusion d'un transfer
+LENDER_KEYWORDS_TRANSFER = ('CREDIT', 'LOAN', 'PRET', 'PRÊT', 'FINANCE', 'MONEY', 'CASH', 'SECOURS')
+_RE_LENDER_KEYWORDS = _compiler_alternance(LENDER_KEYWORDS_TRANSFER)
 
 def est_exclus(nom, categorie=''):
     """
@@ -211,49 +280,36 @@ def est_exclus(nom, categorie=''):
     """
     nom_upper = nom.upper()
 
-    # 1. PRIORITÉ: Vérifier catégorie Inverite
+    # 1. PRIORITÉ: Vérifier catégorie Inverite (une seule regex pour
+    # gambling/casino, groceries/gas/utilities/assurances et ATM)
     if categorie:
         categorie_lower = categorie.lower()
 
-        # Exclure gambling/casino
-        if 'gambling' in categorie_lower or 'casino' in categorie_lower:
-            print(f"   ⚠️ EXCLU (gambling): {nom}")
+        if _RE_CATEGORIES_EXCLUES.search(categorie_lower):
+            # Même trace que les tests dans l'ordre d'origine: gambling,
+            # puis courantes (sans trace), sinon c'est un ATM
+            if any(x in categorie_lower for x in CATEGORIES_GAMBLING):
+                print(f"   ⚠️ EXCLU (gambling): {nom}")
+            elif not any(x in categorie_lower for x in CATEGORIES_COURANTES):
+                print(f"   ⚠️ EXCLU (ATM): {nom}")
             return True
 
-        # Exclure groceries, gas, utilities
-        if any(x in categorie_lower for x in ['groceries', 'gas', 'fuel', 'utilities', 'bills', 'insurance/car', 'insurance/life']):
-            return True
-
-        # Exclure ATM (mais PAS les transfers - peuvent être des paiements prêteurs)
-        if 'atm' in categorie_lower:
-            print(f"   ⚠️ EXCLU (ATM): {nom}")
-            return True
-
-        # Pour les transfers, vérifier si c'est un prêteur connu AVANT d'exclure
+        # Pour les transfers (PAS exclus d'office - peuvent être des paiements
+        # prêteurs): mots-clés prêteurs d'abord (regex), puis liste officielle
         if 'transfer' in categorie_lower:
-            # Ne PAS exclure si le nom contient un prêteur connu
-            from listes_completes_v2 import est_preteur
-            is_lender, _ = est_preteur(nom)
-            if not is_lender:
-                # Vérifier aussi les mots-clés prêteurs
-                nom_upper = nom.upper()
-                lender_keywords = ['CREDIT', 'LOAN', 'PRET', 'PRÊT', 'FINANCE', 'MONEY', 'CASH', 'SECOURS']
-                if not any(kw in nom_upper for kw in lender_keywords):
+            if not _RE_LENDER_KEYWORDS.search(nom_upper):
+                if not contient_preteur_majuscules(nom_upper):
                     print(f"   ⚠️ EXCLU (transfer non-prêteur): {nom}")
                     return True
 
     # 2. CRITIQUE: Exclure patterns de transactions bancaires
-    for pattern in EXCLUSIONS_PATTERNS:
-        if pattern in nom_upper:
-            print(f"   ⚠️ EXCLU (pattern bancaire): {nom}")
-            return True
-
-    # 3. Vérifier listes d'exclusions hardcodées
-    toutes_exclusions = EXCLUSIONS_GAMBLING + EXCLUSIONS_SERVICES_PAIEMENT + EXCLUSIONS_AUTRES + EXCLUSIONS_PATTERNS
+    if _RE_EXCLUSIONS_PATTERNS.search(nom_upper):
+        print(f"   ⚠️ EXCLU (pattern bancaire): {nom}")
+        return True
 
-    for exclusion in toutes_exclusions:
-        if exclusion in nom_upper:
-            return True
+    # 3. Vérifier listes d'exclusions hardcodées (une seule passe regex)
+    if _RE_TOUTES_EXCLUSIONS.search(nom_upper):
+        return True
 
     # 4. Exclure noms trop courts (< 4 caractères)
     if len(nom.strip()) < 4:
@@ -266,7 +322,195 @@ def est_exclus(nom, categorie=''):
 # FONCTIONS UTILITAIRES
 # =============================================================================
 
-def count_similar_transactions(description, transaction_history, threshold=0.8):
+@lru_cache(maxsize=4096)
+def _parse_date(date_str):
+    """
+    Parse une date "AAAA-MM-JJ" (cache: meme date sur plusieurs transactions)
+
+    Returns:
+        datetime ou None si la date est invalide
+    """
+    # Chemin rapide ISO (fromisoformat est implemente en C). Limite a la forme
+    # AAAA-MM-JJ: fromisoformat accepte d'autres formes ISO (ex: 2025-W01-1)
+    # que strptime refuse.
+    if len(date_str) == 10 and date_str[4] == '-' and date_str[7] == '-':
+        try:
+            return datetime.fromisoformat(date_str)
+        except ValueError:
+            pass
+
+    # strptime reste la reference (accepte aussi 2025-1-5)
+    try:
+        return datetime.strptime(date_str, "%Y-%m-%d")
+    except ValueError:
+        return None
+
+
+# Cles canoniques d'une transaction apres normalize_transactions()
+# (desc_upper: description deja en majuscules, calculee une seule fois;
+#  date_parsed: datetime de 'date', ou None si absente/invalide)
+CLES_TRANSACTION = frozenset(['description', 'desc_upper', 'amount', 'date', 'date_parsed', 'type', 'category'])
+
+
+def _date_transaction(date):
+    """Date d'une transaction en datetime ('date' texte: 10 premiers caracteres)"""
+    if isinstance(date, str):
+        return _parse_date(date[:10])
+    return date or None
+
+
+def normalize_transactions(transactions):
+    """
+    Normalise les transactions vers un schema unique (cles minuscules)
+
+    Les differents formats d'entree (description/Description, amount/Montant,
+    date/Date, type/Type) sont resolus une seule fois a l'entree: le reste du
+    code accede ensuite directement a trans['description'], trans['amount'],
+    etc. La description en majuscules est precalculee dans 'desc_upper' et
+    la date deja parsee dans 'date_parsed' ('date' reste la valeur d'origine,
+    affichee telle quelle dans les rapports).
+    Une transaction deja normalisee est reutilisee telle quelle.
+
+    Args:
+        transactions: Liste de dicts (formats mixtes acceptes)
+
+    Returns:
+        list[dict]: {'description', 'desc_upper', 'amount', 'date',
+                     'date_parsed', 'type', 'category'}
+    """
+    normalisees = []
+    for trans in transactions:
+        if CLES_TRANSACTION <= trans.keys():
+            normalisees.append(trans)
+            continue
+        description = trans.get('description', trans.get('Description', ''))
+        date = trans.get('date', trans.get('Date', ''))
+        normalisees.append({
+            'description': description,
+            'desc_upper': trans.get('desc_upper') or description.upper(),
+            'amount': trans.get('amount', trans.get('Montant', 0)),
+            'date': date,
+            'date_parsed': _date_transaction(date),
+            'type': trans.get('type', trans.get('Type', '')),
+            'category': trans.get('category', '')
+        })
+    return normalisees
+
+
+def _mots_transaction(past_trans):
+    """Ensemble des mots (majuscules) d'une transaction de l'historique"""
+    # Supporter differents formats de transaction
+    if isinstance(past_trans, dict):
+        if 'desc_upper' in past_trans:
+            return frozenset(past_trans['desc_upper'].split())
+        past_desc = past_trans.get('description', past_trans.get('Description', ''))
+    else:
+        past_desc = str(past_trans)
+    return frozenset(past_desc.upper().split())
+
+
+def build_similarity_index(transaction_history):
+    """
+    Construit un index inverse (mot -> ensembles de mots) sur l'historique
+
+    Construit une seule fois par releve: chaque recherche de similarite ne
+    compare ensuite que les descriptions partageant au moins un mot. Les mots
+    sont internes en identifiants entiers et chaque ensemble est stocke comme
+    un masque de bits (int), l'intersection se calcule donc avec un ET binaire
+    et un popcount (int.bit_count) au lieu d'operations sur des sets Python.
+
+    Args:
+        transaction_history: Liste des transactions passees
+
+    Returns:
+        dict: {
+            'masques': list[int],             # Masque de bits par ensemble unique
+            'tailles': list[int],             # Nb de mots par ensemble
+            'occurrences': list[int],         # Nb de transactions par ensemble
+            'ids_mots': dict[str, int],       # Mot -> identifiant (bit)
+            'index_mots': dict[int, list[int]],
+            'cache': dict                     # Resultats deja calcules
+        }
+    """
+    positions = {}
+    masques = []
+    tailles = []
+    occurrences = []
+    ids_mots = {}
+    index_mots = defaultdict(list)
+
+    for past_trans in transaction_history or []:
+        past_words = _mots_transaction(past_trans)
+        if not past_words:
+            continue
+
+        pos = positions.get(past_words)
+        if pos is None:
+            pos = positions[past_words] = len(masques)
+            masque = 0
+            for mot in past_words:
+                id_mot = ids_mots.setdefault(mot, len(ids_mots))
+                masque |= 1 << id_mot
+                index_mots[id_mot].append(pos)
+            masques.append(masque)
+            tailles.append(len(past_words))
+            occurrences.append(0)
+        occurrences[pos] += 1
+
+    return {
+        'masques': masques,
+        'tailles': tailles,
+        'occurrences': occurrences,
+        'ids_mots': ids_mots,
+        'index_mots': dict(index_mots),
+        'cache': {}
+    }
+
+
+def _count_similar_indexed(desc_words, history_index, threshold):
+    """Comptage Jaccard limite aux candidats de l'index inverse"""
+    cache = history_index['cache']
+    cle = (desc_words, threshold)
+    if cle in cache:
+        return cache[cle]
+
+    # Masque de la requete (les mots absents de l'historique ne comptent
+    # que dans la taille de l'union) et candidats partageant un mot
+    ids_mots = history_index['ids_mots']
+    index_mots = history_index['index_mots']
+    masque_requete = 0
+    candidats = set()
+    for mot in desc_words:
+        id_mot = ids_mots.get(mot)
+        if id_mot is not None:
+            masque_requete |= 1 << id_mot
+            candidats.update(index_mots[id_mot])
+
+    masques = history_index['masques']
+    tailles = history_index['tailles']
+    occurrences = history_index['occurrences']
+    nb_mots = len(desc_words)
+    similar_count = 0
+
+    for pos in candidats:
+        taille = tailles[pos]
+        # Borne superieure: Jaccard <= min(|A|, |B|) / max(|A|, |B|)
+        if taille < nb_mots:
+            if taille / nb_mots < threshold:
+                continue
+        elif nb_mots / taille < threshold:
+            continue
+
+        intersection = (masque_requete & masques[pos]).bit_count()
+        union = nb_mots + taille - intersection
+        if intersection / union >= threshold:
+            similar_count += occurrences[pos]
+
+    cache[cle] = similar_count
+    return similar_count
+
+
+def count_similar_transactions(description, transaction_history, threshold=0.8, history_index=None):
     """
     Compte les transactions similaires dans l'historique
 
@@ -274,59 +518,93 @@ def count_similar_transactions(description, transaction_history, threshold=0.8):
         description: Description de la transaction actuelle
         transaction_history: Liste des transactions passees
         threshold: Similarite minimale (80% par defaut)
+        history_index: Index pre-construit par build_similarity_index (optionnel)
 
     Returns:
         int: Nombre de transactions similaires
     """
+    # Chemin rapide: index inverse (un seuil nul compte aussi les ensembles
+    # sans mot commun, on garde alors la boucle complete)
+    if history_index is not None and threshold > 0:
+        desc_words = frozenset(description.upper().split())
+        if not desc_words:
+            return 0
+        return _count_similar_indexed(desc_words, history_index, threshold)
+
     if not transaction_history:
         return 0
 
     similar_count = 0
-    desc_words = set(description.upper().split())
+    desc_words = frozenset(description.upper().split())
+    nb_mots = len(desc_words)
 
-    if len(desc_words) == 0:
+    if nb_mots == 0:
         return 0
 
     for past_trans in transaction_history:
-        # Supporter differents formats de transaction
-        if isinstance(past_trans, dict):
-            past_desc = past_trans.get('description', past_trans.get('Description', ''))
-        else:
-            past_desc = str(past_trans)
+        past_words = _mots_transaction(past_trans)
+        taille = len(past_words)
 
-        past_words = set(past_desc.upper().split())
+        if taille == 0:
+            continue
 
-        if len(past_words) == 0:
+        # Sortie anticipee: Jaccard <= min(|A|, |B|) / max(|A|, |B|),
+        # inutile de calculer les ensembles si la borne est sous le seuil
+        if taille < nb_mots:
+            if taille / nb_mots < threshold:
+                continue
+        elif nb_mots / taille < threshold:
             continue
 
-        # Calcul similarite Jaccard
+        # Calcul similarite Jaccard (union = |A| + |B| - intersection)
         intersection = len(desc_words & past_words)
-        union = len(desc_words | past_words)
+        union = nb_mots + taille - intersection
 
-        if union > 0:
-            similarity = intersection / union
-            if similarity >= threshold:
-                similar_count += 1
+        similarity = intersection / union
+        if similarity >= threshold:
+            similar_count += 1
 
     return similar_count
 
 
+class _TableCaracteresSpeciaux(dict):
+    """
+    Table pour str.translate: caractere special -> espace
+
+    Equivalent a la regex [^\w\s]: lettres, chiffres, '_' et espaces
+    (Unicode compris) sont conserves. Les entrees sont calculees a la demande
+    puis memorisees, la table ne contient donc que les caracteres rencontres.
+    """
+
+    def __missing__(self, code):
+        caractere = chr(code)
+        if caractere.isalnum() or caractere == '_' or caractere.isspace():
+            valeur = code
+        else:
+            valeur = ' '
+        self[code] = valeur
+        return valeur
+
+
+_TABLE_CARACTERES_SPECIAUX = _TableCaracteresSpeciaux()
+
+
+@lru_cache(maxsize=8192)
 def normalize_description(description):
-    """Normalise une description pour comparaison"""
+    """Normalise une description pour comparaison (cache: marchands recurrents)"""
     if not description:
         return ""
-    # Majuscules, retirer caracteres speciaux
-    normalized = description.upper()
-    normalized = re.sub(r'[^\w\s]', ' ', normalized)
-    normalized = re.sub(r'\s+', ' ', normalized).strip()
-    return normalized
+    # Majuscules, retirer caracteres speciaux (str.translate, boucle C),
+    # puis split/join pour compacter les espaces
+    normalized = description.upper().translate(_TABLE_CARACTERES_SPECIAUX)
+    return ' '.join(normalized.split())
 
 
 # =============================================================================
 # FONCTION PRINCIPALE: SCORING HYBRIDE
 # =============================================================================
 
-def calculate_lender_score_hybrid(description, amount, transaction_history=None):
+def calculate_lender_score_hybrid(description, amount, transaction_history=None, history_index=None):
     """
     Calcule le score d'un preteur avec approche hybride
 
@@ -339,6 +617,7 @@ def calculate_lender_score_hybrid(description, amount, transaction_history=None)
         description: Description de la transaction
         amount: Montant de la transaction (valeur absolue)
         transaction_history: Liste des transactions passees (optionnel)
+        history_index: Index de similarite pre-construit (optionnel)
 
     Returns:
         dict: {
@@ -351,13 +630,55 @@ def calculate_lender_score_hybrid(description, amount, transaction_history=None)
         }
     """
 
+    verdict = _verdict_transaction(description, amount, transaction_history, history_index)
+    score, confidence, source, reasons, preteur_nom, action = verdict
+    return {
+        'score': score,
+        'confidence': confidence,
+        'source': source,
+        'reasons': list(reasons),
+        'preteur_nom': preteur_nom,
+        'action': action
+    }
+
+
+def _verdict_transaction(description, amount, transaction_history=None, history_index=None):
+    """
+    Scoring sans construction du dict resultat
+
+    Returns:
+        tuple: (score, confidence, source, reasons, preteur_nom, action),
+        reasons etant un tuple partage (cache): ne pas le modifier
+    """
+    # Etapes 1-2: ne dependent que de la description (cache)
+    verdict, desc_upper, keywords_found = _verdict_description(description)
+    if verdict is not None:
+        return verdict
+
     if transaction_history is None:
         transaction_history = []
 
     # Valeur absolue du montant
     amount = abs(amount) if amount else 0
-    desc_upper = normalize_description(description)
 
+    # Regle C: seule partie dependant de l'historique
+    similar_count = count_similar_transactions(description, transaction_history,
+                                               history_index=history_index)
+
+    # Etapes 3-5: cache sur (description, montant exact, repetitions)
+    return _score_regles(description, desc_upper, keywords_found, amount, similar_count)
+
+
+@lru_cache(maxsize=4096)
+def _verdict_description(description):
+    """
+    Etapes 1-2 du scoring (listes officielles, exclusions, non-preteurs)
+
+    Returns:
+        tuple: (verdict, desc_upper, keywords_found) ou verdict est None si
+        les regles intelligentes doivent etre appliquees, sinon un tuple
+        (score, confidence, source, reasons, preteur_nom, action)
+    """
     # =========================================================================
     # ETAPE 1: VERIFICATION LISTE OFFICIELLE (PRIORITE ABSOLUE)
     # =========================================================================
@@ -371,41 +692,66 @@ def calculate_lender_score_hybrid(description, amount, transaction_history=None)
         if result['nom'] in PRETEURS_COMPLEMENTAIRES:
             source = 'LISTE_COMPLEMENTAIRE'
 
-        return {
-            'score': 95 if source == 'LISTE_OPC' else 90,
-            'confidence': 'TRES ELEVEE',
-            'source': source,
-            'reasons': [f"Preteur officiel identifie: {result['nom']}"],
-            'preteur_nom': result['nom'],
-            'action': 'CONFIRMER - Preteur officiel du gouvernement du Quebec'
-        }
+        return (
+            95 if source == 'LISTE_OPC' else 90,
+            'TRES ELEVEE',
+            source,
+            (f"Preteur officiel identifie: {result['nom']}",),
+            result['nom'],
+            'CONFIRMER - Preteur officiel du gouvernement du Quebec'
+        ), '', ()
 
     # Exclusion automatique (assurance/casino/syndic/commerce)
     if result['doit_exclure']:
-        return {
-            'score': 0,
-            'confidence': 'N/A',
-            'source': 'EXCLUSION',
-            'reasons': [f"Exclusion automatique: {result['type'].upper()} ({result['nom']})"],
-            'preteur_nom': '',
-            'action': f"EXCLURE - {result['type'].capitalize()} identifie"
-        }
+        return (
+            0,
+            'N/A',
+            'EXCLUSION',
+            (f"Exclusion automatique: {result['type'].upper()} ({result['nom']})",),
+            '',
+            f"EXCLURE - {result['type'].capitalize()} identifie"
+        ), '', ()
+
+    # Normalisation seulement si les regles doivent etre appliquees
+    desc_upper = normalize_description(description)
 
     # =========================================================================
     # ETAPE 2: VERIFIER NON-PRETEURS EN PRIORITE
     # =========================================================================
 
-    # Si clairement un non-preteur, retourner 0 immediatement
-    for non_kw in NON_PRETEUR_KEYWORDS:
-        if non_kw in desc_upper:
-            return {
-                'score': 0,
-                'confidence': 'TRES FAIBLE',
-                'source': 'AUCUNE',
-                'reasons': [f"Non-preteur detecte: {non_kw}"],
-                'preteur_nom': '',
-                'action': 'NON-PRETEUR - Ignorer'
-            }
+    # Une seule passe pour l'etape 2 et la regle A: si clairement un
+    # non-preteur, retourner 0 immediatement, sinon collecter les mots-cles
+    keywords_presents = set()
+    for match in _RE_MOTS_CLES_SCORING.finditer(desc_upper):
+        if match.lastgroup == 'non':
+            # Premier mot-cle dans l'ordre de la liste (pour la raison affichee)
+            non_kw = next(kw for kw in NON_PRETEUR_KEYWORDS if kw in desc_upper)
+            return (
+                0,
+                'TRES FAIBLE',
+                'AUCUNE',
+                (f"Non-preteur detecte: {non_kw}",),
+                '',
+                'NON-PRETEUR - Ignorer'
+            ), desc_upper, ()
+        keywords_presents.update(_KEYWORDS_PREFIXES[match.group('kw')])
+
+    # Liste dans l'ordre de KEYWORDS_PRETEUR (mots imbriques inclus)
+    keywords_found = tuple(kw for kw in KEYWORDS_PRETEUR if kw in keywords_presents)
+    return None, desc_upper, keywords_found
+
+
+@lru_cache(maxsize=4096)
+def _score_regles(description, desc_upper, keywords_found, amount, similar_count):
+    """
+    Etapes 3-5 du scoring (regles intelligentes, penalites, confiance)
+
+    Fonction pure: le resultat ne depend que des arguments, ce qui permet de
+    le mettre en cache pour les transactions recurrentes identiques.
+
+    Returns:
+        tuple: (score, confidence, source, reasons, preteur_nom, action)
+    """
 
     # =========================================================================
     # ETAPE 3: APPLIQUER REGLES INTELLIGENTES
@@ -417,11 +763,7 @@ def calculate_lender_score_hybrid(description, amount, transaction_history=None)
     # -------------------------------------------------------------------------
     # REGLE A: Mots-cles suspects (+30 points)
     # -------------------------------------------------------------------------
-    keywords_found = []
-    for keyword in KEYWORDS_PRETEUR:
-        if keyword in desc_upper:
-            keywords_found.append(keyword)
-
+    # (keywords_found collectes a l'etape 2, meme passe regex)
     if keywords_found:
         score += 30
         reasons.append(f"Mots-cles suspects: {', '.join(keywords_found[:3])}")
@@ -436,8 +778,7 @@ def calculate_lender_score_hybrid(description, amount, transaction_history=None)
     # -------------------------------------------------------------------------
     # REGLE C: Transactions repetitives (+10 a +35 points)
     # -------------------------------------------------------------------------
-    similar_count = count_similar_transactions(description, transaction_history)
-
+    # (similar_count calcule par l'appelant a partir de l'historique)
     if similar_count >= 5:
         score += 35
         reasons.append(f"Transactions tres repetitives ({similar_count} similaires)")
@@ -451,11 +792,10 @@ def calculate_lender_score_hybrid(description, amount, transaction_history=None)
     # -------------------------------------------------------------------------
     # REGLE D: Prefixes bancaires (+10 points)
     # -------------------------------------------------------------------------
-    for prefix in PREFIXES_SUSPECTS:
-        if desc_upper.startswith(prefix):
-            score += 10
-            reasons.append(f"Prefixe bancaire suspect: {prefix}")
-            break
+    prefix_match = _RE_PREFIXES_SUSPECTS.match(desc_upper)
+    if prefix_match:
+        score += 10
+        reasons.append(f"Prefixe bancaire suspect: {prefix_match.group(0)}")
 
     # -------------------------------------------------------------------------
     # REGLE E: Montants typiques payday loans (+10 points)
@@ -484,8 +824,8 @@ def calculate_lender_score_hybrid(description, amount, transaction_history=None)
         reasons.append("Combinaison: LOAN + repetitions")
 
     # Combinaison 4: Triple combinaison (prefixe + keyword + montant)
-    has_prefix = any(desc_upper.startswith(p) for p in ["PMT", "VIR"])
-    has_keyword = any(kw in desc_upper for kw in ["CREDIT", "LOAN", "FINANCE", "PRET"])
+    has_prefix = desc_upper.startswith(PREFIXES_COMBINAISON)
+    has_keyword = any(kw in desc_upper for kw in KEYWORDS_COMBINAISON)
     has_amount = 50 <= amount <= 5000
 
     if has_prefix and has_keyword and has_amount:
@@ -553,20 +893,33 @@ def calculate_lender_score_hybrid(description, amount, transaction_history=None)
     else:
         source = 'AUCUNE'
 
-    return {
-        'score': final_score,
-        'confidence': confidence,
-        'source': source,
-        'reasons': reasons,
-        'preteur_nom': '',  # Pas dans liste officielle
-        'action': action
-    }
+    # preteur_nom vide: pas dans liste officielle
+    return final_score, confidence, source, tuple(reasons), '', action
 
 
 # =============================================================================
 # DETECTION DES PRETEURS DANS LES TRANSACTIONS
 # =============================================================================
 
+GROUPES_DETECTION = ('confirmes', 'probables', 'possibles', 'exclusions')
+GROUPES_PAR_NOM = frozenset(['confirmes', 'exclusions'])
+GROUPES_SCORE_MAX = frozenset(['probables', 'possibles'])
+SOURCES_LISTES = frozenset(['LISTE_OPC', 'LISTE_COMPLEMENTAIRE'])
+
+
+def _groupe_detection(score, source):
+    """Groupe de detection selon la source et le score (None = ignorer)"""
+    if source == 'EXCLUSION':
+        return 'exclusions'
+    if source in SOURCES_LISTES:
+        return 'confirmes'
+    if score >= 60:
+        return 'probables'
+    if score >= 40:
+        return 'possibles'
+    return None
+
+
 def detect_lenders_hybrid(transactions):
     """
     Detecte tous les preteurs dans une liste de transactions
@@ -585,106 +938,91 @@ def detect_lenders_hybrid(transactions):
         }
     """
 
-    preteurs_confirmes = {}   # Cle = nom preteur
-    preteurs_probables = {}
-    preteurs_possibles = {}
-    exclusions = {}
-
-    # Construire l'historique pour detection repetitions
-    transaction_history = transactions.copy()
-
-    for trans in transactions:
-        description = trans.get('description', trans.get('Description', ''))
-        amount = trans.get('amount', trans.get('Montant', 0))
-        date = trans.get('date', trans.get('Date', ''))
-        trans_type = trans.get('type', trans.get('Type', ''))
-
-        # Seulement analyser les debits (paiements vers preteurs)
-        if amount > 0:
-            continue  # Credits = depots, pas des paiements preteurs
-
-        amount = abs(amount)
+    # Un seul dict de groupes: cle = nom preteur (listes) ou description
+    groupes = {nom: {} for nom in GROUPES_DETECTION}
+    preteurs_confirmes = groupes['confirmes']
+    preteurs_probables = groupes['probables']
+    preteurs_possibles = groupes['possibles']
+    exclusions = groupes['exclusions']
+
+    transactions = normalize_transactions(transactions)
+
+    # Historique pour detection repetitions: lecture seule, pas de copie
+    # (normalize_transactions retourne deja une nouvelle liste)
+    transaction_history = transactions
+    history_index = build_similarity_index(transaction_history)
+
+    # Filtrage en une seule passe: seulement les debits (paiements vers preteurs),
+    # les credits = depots, pas des paiements preteurs
+    debits = [
+        (trans['description'], abs(trans['amount']), trans['date'], trans['category'])
+        for trans in transactions
+        if not trans['amount'] > 0
+    ]
 
-        # NOUVEAU: Récupérer catégorie Inverite
-        categorie = trans.get('category', '')
+    # Verdicts par description unique: les transactions recurrentes identiques
+    # (meme description, meme montant) ne passent qu'une fois dans le scoring
+    exclusions_par_description = {}
+    scores_par_description = {}
 
+    for description, amount, date, categorie in debits:
         # NOUVEAU: Exclure si gambling, groceries, etc.
-        if est_exclus(description, categorie):
+        cle_exclusion = (description, categorie)
+        exclu = exclusions_par_description.get(cle_exclusion)
+        if exclu is None:
+            exclu = exclusions_par_description[cle_exclusion] = est_exclus(description, categorie)
+        if exclu:
             continue
 
         # Calculer le score
-        result = calculate_lender_score_hybrid(description, amount, transaction_history)
-
-        score = result['score']
-        source = result['source']
-        preteur_nom = result['preteur_nom'] or description[:40]
-
-        # Creer entry pour le preteur
-        entry = {
-            'nom': preteur_nom,
-            'score': score,
-            'confidence': result['confidence'],
-            'source': source,
-            'reasons': result['reasons'],
-            'action': result['action'],
-            'transactions': [],
-            'total_paye': 0
-        }
+        cle_score = (description, amount)
+        verdict = scores_par_description.get(cle_score)
+        if verdict is None:
+            verdict = scores_par_description[cle_score] = _verdict_transaction(
+                description, amount, transaction_history, history_index
+            )
 
-        # Categoriser selon le score et la source
-        if source == 'EXCLUSION':
-            key = preteur_nom
-            if key not in exclusions:
-                exclusions[key] = entry
-            exclusions[key]['transactions'].append({
-                'date': date,
-                'description': description,
-                'amount': amount
-            })
-            exclusions[key]['total_paye'] += amount
+        # Verdict en tuple: le dict et la liste des raisons ne sont construits
+        # que pour la premiere transaction d'un groupe (ou un nouveau score max)
+        score, confidence, source, reasons, preteur_nom, action = verdict
+        groupe_nom = _groupe_detection(score, source)
+        if groupe_nom is None:
+            continue
 
-        elif source in ['LISTE_OPC', 'LISTE_COMPLEMENTAIRE']:
-            key = preteur_nom
-            if key not in preteurs_confirmes:
-                preteurs_confirmes[key] = entry
-            preteurs_confirmes[key]['transactions'].append({
-                'date': date,
-                'description': description,
-                'amount': amount
-            })
-            preteurs_confirmes[key]['total_paye'] += amount
+        preteur_nom = preteur_nom or description[:40]
 
-        elif score >= 60:
-            # Grouper par description similaire
+        # Cle de regroupement: nom du preteur (listes) ou description similaire
+        if groupe_nom in GROUPES_PAR_NOM:
+            key = preteur_nom
+        else:
             key = normalize_description(description)[:30]
-            if key not in preteurs_probables:
-                preteurs_probables[key] = entry
-            preteurs_probables[key]['transactions'].append({
-                'date': date,
-                'description': description,
-                'amount': amount
-            })
-            preteurs_probables[key]['total_paye'] += amount
-            # Mettre a jour le score max
-            if score > preteurs_probables[key]['score']:
-                preteurs_probables[key]['score'] = score
-                preteurs_probables[key]['confidence'] = result['confidence']
-                preteurs_probables[key]['reasons'] = result['reasons']
 
-        elif score >= 40:
-            key = normalize_description(description)[:30]
-            if key not in preteurs_possibles:
-                preteurs_possibles[key] = entry
-            preteurs_possibles[key]['transactions'].append({
-                'date': date,
-                'description': description,
-                'amount': amount
-            })
-            preteurs_possibles[key]['total_paye'] += amount
-            if score > preteurs_possibles[key]['score']:
-                preteurs_possibles[key]['score'] = score
-                preteurs_possibles[key]['confidence'] = result['confidence']
-                preteurs_possibles[key]['reasons'] = result['reasons']
+        groupe = groupes[groupe_nom]
+        entry = groupe.get(key)
+        if entry is None:
+            # Creer entry pour le preteur (premiere transaction du groupe)
+            entry = groupe[key] = {
+                'nom': preteur_nom,
+                'score': score,
+                'confidence': confidence,
+                'source': source,
+                'reasons': list(reasons),
+                'action': action,
+                'transactions': [],
+                'total_paye': 0
+            }
+        elif groupe_nom in GROUPES_SCORE_MAX and score > entry['score']:
+            # Mettre a jour le score max
+            entry['score'] = score
+            entry['confidence'] = confidence
+            entry['reasons'] = list(reasons)
+
+        entry['transactions'].append({
+            'date': date,
+            'description': description,
+            'amount': amount
+        })
+        entry['total_paye'] += amount
 
     # Statistiques
     total_dette_confirmee = sum(p['total_paye'] for p in preteurs_confirmes.values())
@@ -716,71 +1054,74 @@ def detect_lenders_hybrid(transactions):
 # FONCTIONS KNOCK-OUT (CRITÈRES ÉLIMINATOIRES)
 # =============================================================================
 
-def extraire_nsf_et_overdraft(transactions, inverite_data=None):
+# Mots-cles NSF (frais reels uniquement) et overdraft
+NSF_KEYWORDS = ['NSF FEE', 'NSF CHARGE', 'FONDS INSUFFISANTS', 'INSUFFICIENT FUNDS']
+OVERDRAFT_KEYWORDS = ['OVERDRAFT', 'DÉCOUVERT', 'FRAIS DÉCOUVERT', 'OD FEE']
+_RE_NSF = _compiler_alternance(NSF_KEYWORDS)
+_RE_OVERDRAFT = _compiler_alternance(OVERDRAFT_KEYWORDS)
+
+
+def extraire_nsf_et_overdraft(transactions, inverite_data=None, maintenant=None):
     """
     Extrait le nombre de NSF et overdrafts
+
+    Args:
+        maintenant: Date de reference des fenetres 30/90 jours
+                    (datetime.now() par defaut)
     Returns:
         tuple: (nsf_30j, overdraft_90j)
     """
+    transactions = normalize_transactions(transactions)
+
     # Si données Inverite disponibles, utiliser les statistics
     if inverite_data:
-        try:
-            # Chercher dans accounts[0].statistics.quarter_all_time
-            accounts = inverite_data.get('accounts', [])
-            if accounts:
-                stats = accounts[0].get('statistics', {})
-                quarter_stats = stats.get('quarter_all_time', {})
+        # Chercher dans accounts[0].statistics.quarter_all_time (les niveaux
+        # absents ou null valent {} au lieu de lever une exception)
+        accounts = inverite_data.get('accounts') or []
+        if accounts:
+            stats = accounts[0].get('statistics') or {}
+            quarter_stats = stats.get('quarter_all_time') or {}
 
+            try:
                 # average_number_nsf est le nombre moyen de NSF par mois
                 nsf_avg = float(quarter_stats.get('average_number_nsf', 0))
 
                 # Arrondir au nombre entier le plus proche pour les 30 jours
                 nsf_30j = round(nsf_avg)
-
-                print(f"   📊 NSF depuis Inverite statistics: {nsf_30j} (moyenne: {nsf_avg})")
-            else:
+            except (TypeError, ValueError, OverflowError) as e:
+                print(f"   ⚠️ Erreur lecture NSF Inverite: {e}")
                 nsf_30j = 0
-
-        except Exception as e:
-            print(f"   ⚠️ Erreur lecture NSF Inverite: {e}")
+            else:
+                print(f"   📊 NSF depuis Inverite statistics: {nsf_30j} (moyenne: {nsf_avg})")
+        else:
             nsf_30j = 0
     else:
         # Fallback: compter manuellement (pour compatibilité anciens formats)
         nsf_30j = 0
-        date_limite_30j = datetime.now() - timedelta(days=30)
+    compter_nsf = not inverite_data
 
-        for trans in transactions:
-            description = trans.get('description', trans.get('Description', '')).upper()
-            date = trans.get('date', trans.get('Date'))
-
-            if isinstance(date, str):
-                try:
-                    date = datetime.strptime(date[:10], "%Y-%m-%d")
-                except:
-                    continue
-
-            if date and date >= date_limite_30j:
-                # NSF réels uniquement
-                if any(kw in description for kw in ['NSF FEE', 'NSF CHARGE', 'FONDS INSUFFISANTS', 'INSUFFICIENT FUNDS']):
-                    nsf_30j += 1
-
-    # Overdraft: garder la détection manuelle
+    # Une seule passe: overdraft sur 90 jours (toujours détection manuelle)
+    # et NSF sur 30 jours (fenêtre incluse dans les 90 jours)
     overdraft_90j = 0
-    date_limite_90j = datetime.now() - timedelta(days=90)
+    if maintenant is None:
+        maintenant = datetime.now()
+    date_limite_30j = maintenant - timedelta(days=30)
+    date_limite_90j = maintenant - timedelta(days=90)
 
     for trans in transactions:
-        description = trans.get('description', trans.get('Description', '')).upper()
-        date = trans.get('date', trans.get('Date'))
+        date = trans['date_parsed']
 
-        if isinstance(date, str):
-            try:
-                date = datetime.strptime(date[:10], "%Y-%m-%d")
-            except:
-                continue
+        if date is None or date < date_limite_90j:
+            continue
+
+        description = trans['desc_upper']
+
+        if _RE_OVERDRAFT.search(description):
+            overdraft_90j += 1
 
-        if date and date >= date_limite_90j:
-            if any(kw in description for kw in ['OVERDRAFT', 'DÉCOUVERT', 'FRAIS DÉCOUVERT', 'OD FEE']):
-                overdraft_90j += 1
+        # NSF réels uniquement
+        if compter_nsf and date >= date_limite_30j and _RE_NSF.search(description):
+            nsf_30j += 1
 
     return nsf_30j, overdraft_90j
 
@@ -865,6 +1206,40 @@ def verifier_knock_outs(data):
     }
 
 
+# Paliers de pénalités du score avancé: seuils triés + table indexée par
+# bisect (ratio: "> seuil" -> bisect_left, budget: "< seuil" -> bisect_right)
+SEUILS_RATIO_DR = (15, 30, 50, 75)
+_PALIERS_RATIO_DR = (
+    None,
+    (5, 'acceptable'),
+    (10, 'modéré'),
+    (15, 'limite'),
+    (20, 'élevé'),
+)
+
+SEUILS_BUDGET = (0, 500, 1000, 1500)
+_PALIERS_BUDGET = (
+    (20, 'Budget négatif'),
+    (15, 'Budget très serré'),
+    (10, 'Budget serré'),
+    (5, 'Budget limite'),
+    None,
+)
+
+_PALIERS_NB_PRETEURS = {
+    5: (20, '5 prêteurs actifs: -20 pts'),
+    4: (15, '4 prêteurs actifs: -15 pts'),
+    3: (10, '3 prêteurs actifs: -10 pts'),
+    2: (5, '2 prêteurs actifs: -5 pts'),
+    1: (2, '1 prêteur actif: -2 pts'),
+}
+
+_PALIERS_NSF = {
+    2: (15, '2 NSF en 30j: -15 pts'),
+    1: (10, '1 NSF en 30j: -10 pts'),
+}
+
+
 def calculer_score_avance(data, knock_outs_result):
     """
     Calcule le score avancé avec pénalités progressives
@@ -897,57 +1272,32 @@ def calculer_score_avance(data, knock_outs_result):
     if revenus > 0:
         ratio_dr = (paiements / revenus) * 100
 
-        if ratio_dr > 75:
-            score -= 20
-            penalites.append(f'Ratio D/R élevé ({ratio_dr:.1f}%): -20 pts')
-        elif ratio_dr > 50:
-            score -= 15
-            penalites.append(f'Ratio D/R limite ({ratio_dr:.1f}%): -15 pts')
-        elif ratio_dr > 30:
-            score -= 10
-            penalites.append(f'Ratio D/R modéré ({ratio_dr:.1f}%): -10 pts')
-        elif ratio_dr > 15:
-            score -= 5
-            penalites.append(f'Ratio D/R acceptable ({ratio_dr:.1f}%): -5 pts')
+        palier = _PALIERS_RATIO_DR[bisect_left(SEUILS_RATIO_DR, ratio_dr)]
+        if palier:
+            points, libelle = palier
+            score -= points
+            penalites.append(f'Ratio D/R {libelle} ({ratio_dr:.1f}%): -{points} pts')
 
     # PÉNALITÉ #2: Budget disponible (poids 25%)
-    if budget < 0:
-        score -= 20
-        penalites.append(f'Budget négatif ({budget:.2f}$): -20 pts')
-    elif budget < 500:
-        score -= 15
-        penalites.append(f'Budget très serré ({budget:.2f}$): -15 pts')
-    elif budget < 1000:
-        score -= 10
-        penalites.append(f'Budget serré ({budget:.2f}$): -10 pts')
-    elif budget < 1500:
-        score -= 5
-        penalites.append(f'Budget limite ({budget:.2f}$): -5 pts')
+    palier = _PALIERS_BUDGET[bisect_right(SEUILS_BUDGET, budget)]
+    if palier:
+        points, libelle = palier
+        score -= points
+        penalites.append(f'{libelle} ({budget:.2f}$): -{points} pts')
 
     # PÉNALITÉ #3: Nombre de prêteurs (poids 20%)
-    if nb_preteurs == 5:
-        score -= 20
-        penalites.append(f'5 prêteurs actifs: -20 pts')
-    elif nb_preteurs == 4:
-        score -= 15
-        penalites.append(f'4 prêteurs actifs: -15 pts')
-    elif nb_preteurs == 3:
-        score -= 10
-        penalites.append(f'3 prêteurs actifs: -10 pts')
-    elif nb_preteurs == 2:
-        score -= 5
-        penalites.append(f'2 prêteurs actifs: -5 pts')
-    elif nb_preteurs == 1:
-        score -= 2
-        penalites.append(f'1 prêteur actif: -2 pts')
+    palier = _PALIERS_NB_PRETEURS.get(nb_preteurs)
+    if palier:
+        points, message = palier
+        score -= points
+        penalites.append(message)
 
     # PÉNALITÉ #4: NSF (poids 10%)
-    if nsf == 2:
-        score -= 15
-        penalites.append(f'2 NSF en 30j: -15 pts')
-    elif nsf == 1:
-        score -= 10
-        penalites.append(f'1 NSF en 30j: -10 pts')
+    palier = _PALIERS_NSF.get(nsf)
+    if palier:
+        points, message = palier
+        score -= points
+        penalites.append(message)
 
     # PÉNALITÉ #5: Overdraft (poids 10%)
     if overdraft == 5:
@@ -985,51 +1335,42 @@ def calculer_score_avance(data, knock_outs_result):
 # CALCUL PROBABILITE REALISTE
 # =============================================================================
 
-def calculer_probabilite_realiste(score_global, ratio_dette, nb_preteurs, montant_demande, capacite_max):
-    """Calcule une probabilité d'approbation réaliste basée sur tous les facteurs de risque"""
+# Paliers de la probabilité d'approbation (mêmes conventions de bisect)
+SEUILS_CHANCE_SCORE = (30, 40, 50, 60, 70, 80)         # score >= seuil
+CHANCES_BASE = (5, 20, 40, 60, 75, 85, 95)
+SEUILS_CHANCE_RATIO_DETTE = (0.4, 0.5, 0.6, 0.8)      # ratio > seuil
+PENALITES_RATIO_DETTE = (0, 10, 20, 30, 40)
+SEUILS_CHANCE_NB_PRETEURS = (4, 6, 8)                 # nb >= seuil
+PENALITES_NB_PRETEURS = (0, 10, 20, 30)
+SEUILS_CHANCE_RATIO_MONTANT = (0.4, 0.6, 0.8)         # ratio > seuil
+PENALITES_RATIO_MONTANT = (0, 5, 10, 15)
+
+
+def _chance_profil(score_global, ratio_dette, nb_preteurs):
+    """Partie de la probabilité qui ne dépend que du profil client (pas du montant)"""
 
     # Probabilité de base selon le score
-    if score_global >= 80:
-        chance_base = 95
-    elif score_global >= 70:
-        chance_base = 85
-    elif score_global >= 60:
-        chance_base = 75
-    elif score_global >= 50:
-        chance_base = 60
-    elif score_global >= 40:
-        chance_base = 40
-    elif score_global >= 30:
-        chance_base = 20
-    else:
-        chance_base = 5
+    chance_base = CHANCES_BASE[bisect_right(SEUILS_CHANCE_SCORE, score_global)]
 
     # Pénalités selon le ratio dette/revenu
-    if ratio_dette > 0.8:
-        chance_base -= 40
-    elif ratio_dette > 0.6:
-        chance_base -= 30
-    elif ratio_dette > 0.5:
-        chance_base -= 20
-    elif ratio_dette > 0.4:
-        chance_base -= 10
+    chance_base -= PENALITES_RATIO_DETTE[bisect_left(SEUILS_CHANCE_RATIO_DETTE, ratio_dette)]
 
     # Pénalités selon le nombre de prêteurs
-    if nb_preteurs >= 8:
-        chance_base -= 30
-    elif nb_preteurs >= 6:
-        chance_base -= 20
-    elif nb_preteurs >= 4:
-        chance_base -= 10
-
-    # Pénalité selon le montant demandé vs capacité
+    chance_base -= PENALITES_NB_PRETEURS[bisect_right(SEUILS_CHANCE_NB_PRETEURS, nb_preteurs)]
+
+    return chance_base
+
+
+def _penalite_montant(montant_demande, capacite_max):
+    """Pénalité selon le montant demandé vs capacité"""
     ratio_montant = montant_demande / capacite_max if capacite_max > 0 else 1
-    if ratio_montant > 0.8:
-        chance_base -= 15
-    elif ratio_montant > 0.6:
-        chance_base -= 10
-    elif ratio_montant > 0.4:
-        chance_base -= 5
+    return PENALITES_RATIO_MONTANT[bisect_left(SEUILS_CHANCE_RATIO_MONTANT, ratio_montant)]
+
+
+def calculer_probabilite_realiste(score_global, ratio_dette, nb_preteurs, montant_demande, capacite_max):
+    """Calcule une probabilité d'approbation réaliste basée sur tous les facteurs de risque"""
+    chance_base = _chance_profil(score_global, ratio_dette, nb_preteurs)
+    chance_base -= _penalite_montant(montant_demande, capacite_max)
 
     # Garantir entre 0 et 100
     return max(0, min(100, chance_base))
@@ -1039,6 +1380,31 @@ def calculer_probabilite_realiste(score_global, ratio_dette, nb_preteurs, montan
 # GENERATION DE RAPPORT ENRICHI
 # =============================================================================
 
+# Lignes de separation du rapport
+_LIGNE_EGAL = "=" * 70
+_LIGNE_TIRET = "-" * 70
+
+# Blocs par preteur: un seul gabarit formate par preteur au lieu de
+# plusieurs f-strings (le rapport final est joint par "\n")
+_MODELE_PRETEUR_CONFIRME = (
+    "  {nom}\n"
+    "  Source: {source}\n"
+    "  Score: {score}/100 | Confiance: {confidence}\n"
+    "  Total paye: ${total_paye:,.2f}"
+)
+_MODELE_PRETEUR_PROBABLE = (
+    "  {nom:.50}\n"
+    "  Source: REGLES INTELLIGENTES\n"
+    "  Score: {score}/100 | Confiance: {confidence}\n"
+    "  Total paye: ${total_paye:,.2f}\n"
+    "  Raisons:"
+)
+_MODELE_PRETEUR_POSSIBLE = (
+    "  {nom:.50}\n"
+    "  Score: {score}/100 | Action: {action}"
+)
+
+
 def generate_report_enrichi(client_info, transactions, detection_result, paiements, filename, inverite_data=None):
     """
     Genere un rapport enrichi avec source de detection et confiance
@@ -1069,132 +1435,129 @@ def generate_report_enrichi(client_info, transactions, detection_result, paiemen
     capacite_mensuelle = monthly_income * 0.50
     capacite_hebdo = capacite_mensuelle / 4.33
 
+    # Horodatage unique du rapport (en-tete, pied de page et fenetres NSF)
+    maintenant = datetime.now()
+    horodatage = maintenant.strftime('%Y-%m-%d %H:%M:%S')
+
     # Construction du rapport
     report = []
+    append = report.append
 
     # En-tete
-    report.append("")
-    report.append("=" * 70)
-    report.append("  RAPPORT D'ANALYSE SAR - SYSTEME HYBRIDE V2.0")
-    report.append("  Solution Argent Rapide")
-    report.append("=" * 70)
-    report.append("")
+    append("")
+    append(_LIGNE_EGAL)
+    append("  RAPPORT D'ANALYSE SAR - SYSTEME HYBRIDE V2.0")
+    append("  Solution Argent Rapide")
+    append(_LIGNE_EGAL)
+    append("")
 
     # Date et source
-    report.append(f"Date du rapport: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    report.append(f"Fichier source: {filename}")
-    report.append("")
+    append(f"Date du rapport: {horodatage}")
+    append(f"Fichier source: {filename}")
+    append("")
 
     # Resume executif
-    report.append("-" * 70)
-    report.append("  RESUME EXECUTIF")
-    report.append("-" * 70)
-    report.append("")
-    report.append(f"Transactions analysees: {stats['total_transactions_analysees']}")
-    report.append(f"Preteurs confirmes (Liste OPC): {stats['nb_preteurs_confirmes']}")
-    report.append(f"Preteurs probables (Regles): {stats['nb_preteurs_probables']}")
-    report.append(f"Preteurs possibles (A verifier): {stats['nb_preteurs_possibles']}")
-    report.append(f"Exclusions (Faux positifs elimines): {stats['nb_exclusions']}")
-    report.append("")
-    report.append(f"Dette confirmee: ${stats['dette_confirmee']:,.2f}")
-    report.append(f"Dette probable: ${stats['dette_probable']:,.2f}")
-    report.append(f"DETTE TOTALE ESTIMEE: ${stats['dette_totale_estimee']:,.2f}")
-    report.append("")
+    append(_LIGNE_TIRET)
+    append("  RESUME EXECUTIF")
+    append(_LIGNE_TIRET)
+    append("")
+    append(f"Transactions analysees: {stats['total_transactions_analysees']}")
+    append(f"Preteurs confirmes (Liste OPC): {stats['nb_preteurs_confirmes']}")
+    append(f"Preteurs probables (Regles): {stats['nb_preteurs_probables']}")
+    append(f"Preteurs possibles (A verifier): {stats['nb_preteurs_possibles']}")
+    append(f"Exclusions (Faux positifs elimines): {stats['nb_exclusions']}")
+    append("")
+    append(f"Dette confirmee: ${stats['dette_confirmee']:,.2f}")
+    append(f"Dette probable: ${stats['dette_probable']:,.2f}")
+    append(f"DETTE TOTALE ESTIMEE: ${stats['dette_totale_estimee']:,.2f}")
+    append("")
 
     # Informations client
-    report.append("-" * 70)
-    report.append("  INFORMATIONS CLIENT")
-    report.append("-" * 70)
-    report.append("")
-    report.append(f"Nom: {client_info.get('nom', 'Non disponible')}")
-    report.append(f"Email: {client_info.get('email', 'Non disponible')}")
-    report.append(f"Telephone: {client_info.get('telephone', 'Non disponible')}")
-    report.append(f"Institution: {client_info.get('institution', 'Non disponible')}")
-    report.append(f"Compte: {client_info.get('compte', 'Non disponible')}")
-    report.append(f"Solde: ${client_info.get('solde', 0):,.2f}")
-    report.append("")
+    append(_LIGNE_TIRET)
+    append("  INFORMATIONS CLIENT")
+    append(_LIGNE_TIRET)
+    append("")
+    append(f"Nom: {client_info.get('nom', 'Non disponible')}")
+    append(f"Email: {client_info.get('email', 'Non disponible')}")
+    append(f"Telephone: {client_info.get('telephone', 'Non disponible')}")
+    append(f"Institution: {client_info.get('institution', 'Non disponible')}")
+    append(f"Compte: {client_info.get('compte', 'Non disponible')}")
+    append(f"Solde: ${client_info.get('solde', 0):,.2f}")
+    append("")
 
     # Capacite financiere
-    report.append("-" * 70)
-    report.append("  CAPACITE FINANCIERE")
-    report.append("-" * 70)
-    report.append("")
-    report.append(f"Revenu mensuel estime: ${monthly_income:,.2f}")
-    report.append(f"Capacite mensuelle (50%): ${capacite_mensuelle:,.2f}")
-    report.append(f"Paiement max/semaine: ${capacite_hebdo:,.2f}")
-    report.append("")
+    append(_LIGNE_TIRET)
+    append("  CAPACITE FINANCIERE")
+    append(_LIGNE_TIRET)
+    append("")
+    append(f"Revenu mensuel estime: ${monthly_income:,.2f}")
+    append(f"Capacite mensuelle (50%): ${capacite_mensuelle:,.2f}")
+    append(f"Paiement max/semaine: ${capacite_hebdo:,.2f}")
+    append("")
 
     # Preteurs confirmes (Liste OPC)
     if preteurs_confirmes:
-        report.append("-" * 70)
-        report.append("  PRETEURS CONFIRMES [LISTE OFFICIELLE OPC]")
-        report.append("  Confiance: TRES ELEVEE (95-100%)")
-        report.append("-" * 70)
-        report.append("")
-
-        for preteur in sorted(preteurs_confirmes, key=lambda x: x['total_paye'], reverse=True):
-            report.append(f"  {preteur['nom']}")
-            report.append(f"  Source: {preteur['source']}")
-            report.append(f"  Score: {preteur['score']}/100 | Confiance: {preteur['confidence']}")
-            report.append(f"  Total paye: ${preteur['total_paye']:,.2f}")
-            report.append(f"  Transactions: {len(preteur['transactions'])}")
+        append(_LIGNE_TIRET)
+        append("  PRETEURS CONFIRMES [LISTE OFFICIELLE OPC]")
+        append("  Confiance: TRES ELEVEE (95-100%)")
+        append(_LIGNE_TIRET)
+        append("")
+
+        for preteur in sorted(preteurs_confirmes, key=itemgetter('total_paye'), reverse=True):
+            append(_MODELE_PRETEUR_CONFIRME.format_map(preteur))
+            append(f"  Transactions: {len(preteur['transactions'])}")
 
             # Afficher les 3 dernieres transactions
             for trans in preteur['transactions'][-3:]:
-                report.append(f"    - {trans['date']}: ${trans['amount']:,.2f}")
-            report.append("")
+                append(f"    - {trans['date']}: ${trans['amount']:,.2f}")
+            append("")
 
     # Preteurs probables (Regles)
     if preteurs_probables:
-        report.append("-" * 70)
-        report.append("  PRETEURS PROBABLES [REGLES INTELLIGENTES]")
-        report.append("  Confiance: ELEVEE (60-79%)")
-        report.append("-" * 70)
-        report.append("")
-
-        for preteur in sorted(preteurs_probables, key=lambda x: x['score'], reverse=True):
-            report.append(f"  {preteur['nom'][:50]}")
-            report.append(f"  Source: REGLES INTELLIGENTES")
-            report.append(f"  Score: {preteur['score']}/100 | Confiance: {preteur['confidence']}")
-            report.append(f"  Total paye: ${preteur['total_paye']:,.2f}")
-            report.append(f"  Raisons:")
+        append(_LIGNE_TIRET)
+        append("  PRETEURS PROBABLES [REGLES INTELLIGENTES]")
+        append("  Confiance: ELEVEE (60-79%)")
+        append(_LIGNE_TIRET)
+        append("")
+
+        for preteur in sorted(preteurs_probables, key=itemgetter('score'), reverse=True):
+            append(_MODELE_PRETEUR_PROBABLE.format_map(preteur))
             for reason in preteur['reasons'][:3]:
-                report.append(f"    - {reason}")
-            report.append("")
+                append(f"    - {reason}")
+            append("")
 
     # Preteurs possibles (A verifier)
     if preteurs_possibles:
-        report.append("-" * 70)
-        report.append("  PRETEURS POSSIBLES [A VERIFIER]")
-        report.append("  Confiance: MOYENNE (40-59%)")
-        report.append("-" * 70)
-        report.append("")
-
-        for preteur in sorted(preteurs_possibles, key=lambda x: x['score'], reverse=True):
-            report.append(f"  {preteur['nom'][:50]}")
-            report.append(f"  Score: {preteur['score']}/100 | Action: {preteur['action']}")
-            report.append(f"  Total: ${preteur['total_paye']:,.2f} ({len(preteur['transactions'])} transactions)")
-            report.append("")
+        append(_LIGNE_TIRET)
+        append("  PRETEURS POSSIBLES [A VERIFIER]")
+        append("  Confiance: MOYENNE (40-59%)")
+        append(_LIGNE_TIRET)
+        append("")
+
+        for preteur in sorted(preteurs_possibles, key=itemgetter('score'), reverse=True):
+            append(_MODELE_PRETEUR_POSSIBLE.format_map(preteur))
+            append(f"  Total: ${preteur['total_paye']:,.2f} ({len(preteur['transactions'])} transactions)")
+            append("")
 
     # Exclusions
     if exclusions:
-        report.append("-" * 70)
-        report.append("  EXCLUSIONS AUTOMATIQUES [FAUX POSITIFS ELIMINES]")
-        report.append("-" * 70)
-        report.append("")
+        append(_LIGNE_TIRET)
+        append("  EXCLUSIONS AUTOMATIQUES [FAUX POSITIFS ELIMINES]")
+        append(_LIGNE_TIRET)
+        append("")
 
         for excl in exclusions:
-            report.append(f"  {excl['nom']}")
-            report.append(f"  Raison: {excl['reasons'][0] if excl['reasons'] else 'Exclusion'}")
-            report.append(f"  Montant exclu: ${excl['total_paye']:,.2f}")
-            report.append("")
+            append(f"  {excl['nom']}")
+            append(f"  Raison: {excl['reasons'][0] if excl['reasons'] else 'Exclusion'}")
+            append(f"  Montant exclu: ${excl['total_paye']:,.2f}")
+            append("")
 
     # ==========================================================================
     # NOUVEAU SYSTÈME DE SCORING AVEC KNOCK-OUTS
     # ==========================================================================
 
     # Extraire NSF et overdrafts des transactions
-    nsf_30j, overdraft_90j = extraire_nsf_et_overdraft(transactions, inverite_data)
+    nsf_30j, overdraft_90j = extraire_nsf_et_overdraft(transactions, inverite_data, maintenant)
 
     # Calculer les variables pour l'évaluation
     total_dette = stats['dette_totale_estimee']
@@ -1223,89 +1586,86 @@ def generate_report_enrichi(client_info, transactions, detection_result, paiemen
 
     # Section KNOCK-OUTS (si détectés)
     if knock_outs_result['has_knock_outs']:
-        report.append("")
-        report.append("=" * 70)
-        report.append("  ⛔ KNOCK-OUTS DÉTECTÉS - REFUS AUTOMATIQUE")
-        report.append("=" * 70)
-        report.append("")
+        append("")
+        append(_LIGNE_EGAL)
+        append("  ⛔ KNOCK-OUTS DÉTECTÉS - REFUS AUTOMATIQUE")
+        append(_LIGNE_EGAL)
+        append("")
 
         for ko in knock_outs_result['knock_outs']:
-            report.append(f"  🔴 {ko['message']}")
+            append(f"  🔴 {ko['message']}")
 
-        report.append("")
-        report.append(f"  Nombre total de knock-outs: {knock_outs_result['nb_knock_outs']}")
-        report.append("  DÉCISION: REFUS - Client ne peut pas payer mathématiquement")
-        report.append("")
+        append("")
+        append(f"  Nombre total de knock-outs: {knock_outs_result['nb_knock_outs']}")
+        append("  DÉCISION: REFUS - Client ne peut pas payer mathématiquement")
+        append("")
 
     # Section SCORE GLOBAL
-    report.append("")
-    report.append("=" * 70)
-    report.append(f"  SCORE GLOBAL: {score_global}/100 - {niveau_risque}")
-    report.append("=" * 70)
-    report.append("")
+    append("")
+    append(_LIGNE_EGAL)
+    append(f"  SCORE GLOBAL: {score_global}/100 - {niveau_risque}")
+    append(_LIGNE_EGAL)
+    append("")
 
     if score_result.get('penalites'):
-        report.append("  Pénalités appliquées:")
+        append("  Pénalités appliquées:")
         for penalite in score_result['penalites']:
-            report.append(f"    • {penalite}")
-        report.append("")
+            append(f"    • {penalite}")
+        append("")
 
     # Offres disponibles
-    report.append("-" * 70)
-    report.append("  OFFRES DISPONIBLES")
-    report.append("-" * 70)
-    report.append("")
+    append(_LIGNE_TIRET)
+    append("  OFFRES DISPONIBLES")
+    append(_LIGNE_TIRET)
+    append("")
 
     capacite_50_pct = capacite_mensuelle  # Capacité max = 50% du revenu mensuel
 
+    # Partie du profil commune à toutes les offres: calculée une seule fois
+    chance_profil = _chance_profil(score_global, ratio_dette_revenu, nb_preteurs)
+
     for montant in [500, 1000, 1500, 2000, 2500, 3000]:
         if montant in paiements:
             paiement_sem = paiements[montant]["sem"]
 
             # NOUVELLE LOGIQUE: Probabilité réaliste
-            chance = calculer_probabilite_realiste(
-                score_global=score_global,
-                ratio_dette=ratio_dette_revenu,
-                nb_preteurs=nb_preteurs,
-                montant_demande=montant,
-                capacite_max=capacite_50_pct
-            )
+            chance = max(0, min(100, chance_profil - _penalite_montant(montant, capacite_50_pct)))
 
-            report.append(f"  ${montant:,} - Paiement: ${paiement_sem:.2f}/sem - Chance: {chance:.1f}%")
+            append(f"  ${montant:,} - Paiement: ${paiement_sem:.2f}/sem - Chance: {chance:.1f}%")
 
-    report.append("")
-    report.append(f"  [Score client: {score_global}/100 | Ratio dette: {ratio_dette_revenu*100:.1f}% | Prêteurs: {nb_preteurs}]")
-    report.append("")
+    append("")
+    append(f"  [Score client: {score_global}/100 | Ratio dette: {ratio_dette_revenu*100:.1f}% | Prêteurs: {nb_preteurs}]")
+    append("")
 
     # Recommandations
-    report.append("-" * 70)
-    report.append("  RECOMMANDATIONS")
-    report.append("-" * 70)
-    report.append("")
+    append(_LIGNE_TIRET)
+    append("  RECOMMANDATIONS")
+    append(_LIGNE_TIRET)
+    append("")
 
     total_dette = stats['dette_totale_estimee']
     nb_preteurs = stats['nb_preteurs_confirmes'] + stats['nb_preteurs_probables']
 
     if nb_preteurs == 0:
-        report.append("  Aucun preteur actif detecte - Client eligible")
+        append("  Aucun preteur actif detecte - Client eligible")
     elif nb_preteurs <= 2 and total_dette < 2000:
-        report.append("  Risque FAIBLE - Client eligible avec prudence")
+        append("  Risque FAIBLE - Client eligible avec prudence")
     elif nb_preteurs <= 4 and total_dette < 5000:
-        report.append("  Risque MOYEN - Verifier capacite de remboursement")
+        append("  Risque MOYEN - Verifier capacite de remboursement")
     else:
-        report.append("  Risque ELEVE - Evaluation approfondie requise")
+        append("  Risque ELEVE - Evaluation approfondie requise")
 
-    report.append("")
+    append("")
 
     # Pied de page
-    report.append("=" * 70)
-    report.append("  FIN DU RAPPORT")
-    report.append("=" * 70)
-    report.append("")
-    report.append("Systeme: SAR Analysis Hybride v2.0")
-    report.append("Listes: OPC Quebec (414 preteurs) + Regles intelligentes")
-    report.append(f"Genere le: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    report.append("")
+    append(_LIGNE_EGAL)
+    append("  FIN DU RAPPORT")
+    append(_LIGNE_EGAL)
+    append("")
+    append("Systeme: SAR Analysis Hybride v2.0")
+    append("Listes: OPC Quebec (414 preteurs) + Regles intelligentes")
+    append(f"Genere le: {horodatage}")
+    append("")
 
     return "\n".join(report)
 
@@ -1314,19 +1674,28 @@ def generate_report_enrichi(client_info, transactions, detection_result, paiemen
 # FONCTIONS AUXILIAIRES (importees de analyser.py)
 # =============================================================================
 
+@lru_cache(maxsize=1)
 def load_paiements_excel():
-    """Charge la grille de paiements depuis le fichier Excel"""
+    """
+    Charge la grille de paiements depuis le fichier Excel
+
+    La grille est statique: lue une seule fois par processus (la valeur
+    retournee est partagee, ne pas la modifier).
+    """
     paiements = {}
     try:
-        wb = load_workbook(EXCEL_FILE)
-        ws = wb.active
-        for row in ws.iter_rows(min_row=2, values_only=True):
-            if row[0] is not None:
-                montant = int(row[0])
-                paiements[montant] = {
-                    "sem": float(row[1]),
-                    "2sem": float(row[2])
-                }
+        wb = load_workbook(EXCEL_FILE, read_only=True)
+        try:
+            ws = wb.active
+            for row in ws.iter_rows(min_row=2, values_only=True):
+                if row[0] is not None:
+                    montant = int(row[0])
+                    paiements[montant] = {
+                        "sem": float(row[1]),
+                        "2sem": float(row[2])
+                    }
+        finally:
+            wb.close()
     except Exception as e:
         print(f"Erreur lecture Excel: {e}")
         paiements = {
@@ -1345,41 +1714,27 @@ def calculate_monthly_income_from_transactions(transactions):
     if not transactions:
         return 0.0
 
-    monthly_income = defaultdict(float)
+    transactions = normalize_transactions(transactions)
 
-    for trans in transactions:
-        amount = trans.get('amount', trans.get('Montant', 0))
-        date = trans.get('date', trans.get('Date'))
-        description = trans.get('description', trans.get('Description', '')).upper()
+    # Une seule passe: revenus de paie et tous les credits cumules en meme
+    # temps (cle de mois (annee, mois) au lieu de strftime("%Y-%m"))
+    revenus_paie = defaultdict(float)
+    revenus_tous = defaultdict(float)
 
-        if amount > 0 and date:  # Credits seulement
-            if isinstance(date, str):
-                try:
-                    date = datetime.strptime(date[:10], "%Y-%m-%d")
-                except:
-                    continue
+    for trans in transactions:
+        amount = trans['amount']
+        date = trans['date_parsed']
 
-            month_key = date.strftime("%Y-%m")
+        if amount > 0 and date is not None:  # Credits dates seulement
+            month_key = (date.year, date.month)
+            revenus_tous[month_key] += amount
 
             # Verifier si c'est un depot de paie
-            if any(kw in description for kw in PAYROLL_KEYWORDS):
-                monthly_income[month_key] += amount
+            if _RE_PAYROLL.search(trans['desc_upper']) is not None:
+                revenus_paie[month_key] += amount
 
-    if not monthly_income:
-        # Compter tous les credits si pas de paie detectee
-        for trans in transactions:
-            amount = trans.get('amount', trans.get('Montant', 0))
-            date = trans.get('date', trans.get('Date'))
-
-            if amount > 0 and date:
-                if isinstance(date, str):
-                    try:
-                        date = datetime.strptime(date[:10], "%Y-%m-%d")
-                    except:
-                        continue
-
-                month_key = date.strftime("%Y-%m")
-                monthly_income[month_key] += amount
+    # Compter tous les credits si pas de paie detectee
+    monthly_income = revenus_paie or revenus_tous
 
     if not monthly_income:
         return 0.0
@@ -1413,6 +1768,26 @@ def extract_tables_from_json(data):
     return None
 
 
+# Prefixe de date AAAA-MM-JJ des cellules de table
+_RE_DATE_ISO = re.compile(r'\d{4}-\d{2}-\d{2}')
+
+# Caracteres retires des montants ("$1,234.56" -> "1234.56") en un seul appel C
+_TABLE_MONTANT = str.maketrans('', '', '$,')
+
+
+def _montant_cellule(row, idx):
+    """Montant d'une cellule de table (0.0 si colonne absente, vide ou invalide)"""
+    if idx < 0 or idx >= len(row):
+        return 0.0
+    montant_str = str(row[idx]).translate(_TABLE_MONTANT).strip()
+    if not montant_str:
+        return 0.0
+    try:
+        return float(montant_str)
+    except ValueError:
+        return 0.0
+
+
 def parse_transactions_from_tables(tables):
     """Parse les transactions depuis les tables JSON"""
     transactions = []
@@ -1424,20 +1799,12 @@ def parse_transactions_from_tables(tables):
         headers = [h.lower() if h else "" for h in table.get("headers", [])]
         rows = table.get("rows", [])
 
-        date_idx = -1
-        details_idx = -1
-        credit_idx = -1
-        debit_idx = -1
-
-        for i, h in enumerate(headers):
-            if h == "date":
-                date_idx = i
-            elif h == "details":
-                details_idx = i
-            elif h == "credit":
-                credit_idx = i
-            elif h == "debit":
-                debit_idx = i
+        # Index des colonnes (en cas de doublon, la derniere colonne gagne)
+        colonnes = {h: i for i, h in enumerate(headers)}
+        date_idx = colonnes.get("date", -1)
+        details_idx = colonnes.get("details", -1)
+        credit_idx = colonnes.get("credit", -1)
+        debit_idx = colonnes.get("debit", -1)
 
         if date_idx == -1:
             continue
@@ -1447,32 +1814,19 @@ def parse_transactions_from_tables(tables):
                 continue
 
             date_str = str(row[date_idx]).strip() if date_idx < len(row) else ""
-            if not date_str or not re.match(r'\d{4}-\d{2}-\d{2}', date_str):
+            # Date complete uniquement (strptime refusait tout texte en trop):
+            # la longueur est testee avant la regex
+            if len(date_str) != 10 or not _RE_DATE_ISO.match(date_str):
                 continue
 
-            try:
-                trans_date = datetime.strptime(date_str, "%Y-%m-%d")
-            except:
+            trans_date = _parse_date(date_str)
+            if trans_date is None:
                 continue
 
             description = str(row[details_idx]).strip().upper() if details_idx >= 0 and details_idx < len(row) else ""
 
-            credit = 0.0
-            debit = 0.0
-
-            if credit_idx >= 0 and credit_idx < len(row):
-                credit_str = str(row[credit_idx]).replace("$", "").replace(",", "").strip()
-                try:
-                    credit = float(credit_str) if credit_str else 0.0
-                except:
-                    credit = 0.0
-
-            if debit_idx >= 0 and debit_idx < len(row):
-                debit_str = str(row[debit_idx]).replace("$", "").replace(",", "").strip()
-                try:
-                    debit = float(debit_str) if debit_str else 0.0
-                except:
-                    debit = 0.0
+            credit = _montant_cellule(row, credit_idx)
+            debit = _montant_cellule(row, debit_idx)
 
             if credit > 0:
                 amount = credit
@@ -1485,7 +1839,9 @@ def parse_transactions_from_tables(tables):
 
             transactions.append({
                 "date": trans_date,
+                "date_parsed": trans_date,
                 "description": description,
+                "desc_upper": description,  # deja en majuscules
                 "amount": amount,
                 "type": trans_type
             })
@@ -1609,6 +1965,35 @@ def run_tests():
             failed += 1
         print()
 
+    # Les descriptions sont comparees en majuscules: les constantes doivent
+    # l'etre aussi (sinon le terme ne correspond jamais)
+    constantes = {
+        'KEYWORDS_PRETEUR': KEYWORDS_PRETEUR,
+        'PREFIXES_SUSPECTS': PREFIXES_SUSPECTS,
+        'NON_PRETEUR_KEYWORDS': NON_PRETEUR_KEYWORDS,
+        'GENERIC_DESCRIPTIONS': GENERIC_DESCRIPTIONS,
+        'PREFIXES_COMBINAISON': PREFIXES_COMBINAISON,
+        'KEYWORDS_COMBINAISON': KEYWORDS_COMBINAISON,
+        'PAYROLL_KEYWORDS': PAYROLL_KEYWORDS,
+        'SAR_KEYWORDS': SAR_KEYWORDS,
+        'TOUTES_EXCLUSIONS': TOUTES_EXCLUSIONS,
+        'LENDER_KEYWORDS_TRANSFER': LENDER_KEYWORDS_TRANSFER,
+    }
+    en_minuscules = [
+        f"{nom}: {terme}"
+        for nom, termes in constantes.items()
+        for terme in termes
+        if terme != terme.upper()
+    ]
+    if not en_minuscules:
+        print("  [PASS] Constantes de scoring en majuscules")
+        passed += 1
+    else:
+        print("  [FAIL] Constantes de scoring en majuscules")
+        print(f"         Termes: {', '.join(en_minuscules)}")
+        failed += 1
+    print()
+
     print("=" * 70)
     print(f"  RESULTATS: {passed} PASS, {failed} FAIL")
     print(f"  Taux de reussite: {passed/(passed+failed)*100:.1f}%")
@@ -1621,14 +2006,47 @@ def run_tests():
 # TRAITEMENT FICHIER JSON
 # =============================================================================
 
+def charger_json(filepath):
+    """
+    Charge un fichier JSON
+
+    orjson (si installe) parse directement les octets du fichier, sans
+    decodage texte intermediaire. Ses erreurs heritent de json.JSONDecodeError.
+    """
+    if orjson is not None:
+        with open(filepath, 'rb') as f:
+            return orjson.loads(f.read())
+    with open(filepath, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
 def process_json_file_hybrid(filepath, paiements):
     """Traite un fichier JSON avec le systeme hybride"""
     try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        data = charger_json(filepath)
+    except json.JSONDecodeError as e:
+        return f"Erreur JSON dans {filepath}: {e}", None
+    except Exception as e:
+        return f"Erreur traitement {filepath}: {e}", None
+
+    return process_json_data_hybrid(data, paiements, os.path.basename(filepath), source=filepath)
 
-        filename = os.path.basename(filepath)
 
+def process_json_data_hybrid(data, paiements, filename="api.json", source=None):
+    """
+    Traite des donnees JSON deja chargees avec le systeme hybride
+
+    Args:
+        data: Dict JSON (Inverite, tables ou transactions)
+        paiements: Grille de paiements
+        filename: Nom affiche comme fichier source du rapport
+        source: Libelle des messages d'erreur (filename par defaut)
+
+    Returns:
+        tuple: (rapport, nom_client) ou (message_erreur, None)
+    """
+    source = source or filename
+    try:
         # Extraire donnees
         tables = extract_tables_from_json(data)
         fulltext = extract_fulltext_from_json(data)
@@ -1684,11 +2102,15 @@ def process_json_file_hybrid(filepath, paiements):
 
         # Format 2: Array 'transactions' direct (tempData de route.ts)
         if not transactions and "transactions" in data:
+            # Cle alternative lue seulement si la premiere est absente (au lieu
+            # de t.get(a, t.get(b)) qui evalue toujours les deux recherches)
             for t in data["transactions"]:
-                date_str = t.get("Date", t.get("date", ""))
-                desc = t.get("Description", t.get("description", ""))
-                amount = t.get("Amount", t.get("amount", t.get("Montant", 0)))
-                trans_type = t.get("Type", t.get("type", ""))
+                date_str = t["Date"] if "Date" in t else t.get("date", "")
+                desc = t["Description"] if "Description" in t else t.get("description", "")
+                amount = (t["Amount"] if "Amount" in t
+                          else t["amount"] if "amount" in t
+                          else t.get("Montant", 0))
+                trans_type = t["Type"] if "Type" in t else t.get("type", "")
                 category = t.get("category", "")
 
                 # Convertir amount en float si string
@@ -1709,7 +2131,7 @@ def process_json_file_hybrid(filepath, paiements):
                 for t in acc.get("transactions", []):
                     date_str = t.get("date", "")
                     # Inverite utilise 'details' pas 'description'
-                    desc = t.get("details", t.get("description", ""))
+                    desc = t["details"] if "details" in t else t.get("description", "")
                     credit = float(t.get("credit", "0") or "0")
                     debit = float(t.get("debit", "0") or "0")
                     category = t.get("category", "")
@@ -1730,7 +2152,10 @@ def process_json_file_hybrid(filepath, paiements):
                     })
 
         if not transactions:
-            return f"Aucune transaction trouvee dans {filepath}", None
+            return f"Aucune transaction trouvee dans {source}", None
+
+        # Schema unique pour toute l'analyse (detection, NSF, revenus)
+        transactions = normalize_transactions(transactions)
 
         # Detection hybride
         detection_result = detect_lenders_hybrid(transactions)
@@ -1740,16 +2165,58 @@ def process_json_file_hybrid(filepath, paiements):
 
         return report, client_info.get("nom", filename)
 
-    except json.JSONDecodeError as e:
-        return f"Erreur JSON dans {filepath}: {e}", None
     except Exception as e:
-        return f"Erreur traitement {filepath}: {e}", None
+        return f"Erreur traitement {source}: {e}", None
 
 
 # =============================================================================
 # MAIN
 # =============================================================================
 
+# Nom de client -> nom de fichier de rapport (regex compilees une seule fois)
+_RE_CARACTERES_INTERDITS = re.compile(r'[^\w\s-]')
+_RE_SEPARATEURS = re.compile(r'[-\s]+')
+
+
+def _nom_fichier_securise(nom):
+    """Retire la ponctuation et remplace espaces/tirets par '_'"""
+    nom = _RE_CARACTERES_INTERDITS.sub('', nom)
+    return _RE_SEPARATEURS.sub('_', nom).strip('_')
+
+
+# Grille de paiements partagee avec les processus de traitement des fichiers
+_PAIEMENTS_PROCESSUS = None
+
+
+def _initialiser_processus_fichiers(paiements):
+    """Initialise un processus de traitement avec la grille de paiements"""
+    global _PAIEMENTS_PROCESSUS
+    _PAIEMENTS_PROCESSUS = paiements
+
+
+def _traiter_fichier(filepath):
+    """Traite un fichier JSON dans un processus du pool"""
+    return process_json_file_hybrid(filepath, _PAIEMENTS_PROCESSUS)
+
+
+def _traiter_fichiers(json_files, paiements):
+    """
+    Traite les fichiers JSON en parallele (un processus par coeur)
+
+    Les fichiers sont independants: chacun est analyse dans un processus,
+    les resultats (rapport, nom_client) sont rendus dans l'ordre de json_files.
+    """
+    processus = min(len(json_files), os.cpu_count() or 1)
+    if processus <= 1:
+        for filepath in json_files:
+            yield process_json_file_hybrid(filepath, paiements)
+        return
+
+    with multiprocessing.Pool(processus, initializer=_initialiser_processus_fichiers,
+                              initargs=(paiements,)) as pool:
+        yield from pool.imap(_traiter_fichier, json_files)
+
+
 def main():
     """Fonction principale"""
 
@@ -1782,8 +2249,7 @@ def main():
         report, client_name = process_json_file_hybrid(filepath, paiements)
 
         if client_name:
-            safe_name = re.sub(r'[^\w\s-]', '', client_name or "api")
-            safe_name = re.sub(r'[-\s]+', '_', safe_name).strip('_')
+            safe_name = _nom_fichier_securise(client_name or "api")
             if not safe_name:
                 safe_name = "api_request"
 
@@ -1824,7 +2290,15 @@ def main():
     print()
 
     # Trouver fichiers JSON
-    json_files = glob.glob(os.path.join(JSON_INPUT_DIR, "*.json"))
+    # scandir: nom et type de chaque entree viennent du meme appel systeme
+    # (comme glob "*.json", les fichiers caches sont ignores)
+    with os.scandir(JSON_INPUT_DIR) as entrees:
+        fichiers_json = [
+            entree for entree in entrees
+            if entree.name.endswith(".json") and not entree.name.startswith(".")
+            and entree.is_file()
+        ]
+    json_files = [entree.path for entree in fichiers_json]
 
     if not json_files:
         print("ATTENTION: Aucun fichier JSON trouve dans json-input/")
@@ -1841,15 +2315,13 @@ def main():
     # Traiter chaque fichier
     reports_generated = 0
 
-    for filepath in json_files:
-        filename = os.path.basename(filepath)
+    # Analyse en parallele, ecriture des rapports dans le processus principal
+    for entree, (report, client_name) in zip(fichiers_json, _traiter_fichiers(json_files, paiements)):
+        filename = entree.name
         print(f"Traitement: {filename}...")
 
-        report, client_name = process_json_file_hybrid(filepath, paiements)
-
         if client_name:
-            safe_name = re.sub(r'[^\w\s-]', '', client_name or filename)
-            safe_name = re.sub(r'[-\s]+', '_', safe_name).strip('_')
+            safe_name = _nom_fichier_securise(client_name or filename)
             if not safe_name:
                 safe_name = filename.replace('.json', '')
 
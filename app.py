@@ -7,28 +7,149 @@ API Flask pour analyser les données Inverite
 """
 
 import os
+import re
 import json
-import tempfile
 import sys
-from flask import Flask, request, jsonify
+import threading
+import unicodedata
+from collections import OrderedDict
+from functools import lru_cache
+from flask import Flask, request, jsonify, send_file
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 from datetime import datetime
 
+try:
+    import orjson
+except ImportError:  # json de la stdlib (provider Flask par défaut)
+    orjson = None
+
 # Import des modules locaux
-from analyser_hybride import process_json_file_hybrid, load_paiements_excel
+from analyser_hybride import process_json_data_hybrid, load_paiements_excel, charger_json
 from listes_completes_v2 import (
-    PRETEURS_TOUS, PRETEURS_OFFICIELS_OPC, categoriser_transaction,
-    est_preteur, est_a_exclure, est_assurance, est_syndic, est_casino
+    PRETEURS_TOUS, PRETEURS_OFFICIELS_OPC, PRETEURS_COMPLEMENTAIRES,
+    categoriser_transaction, est_preteur, est_preteur_majuscules, est_a_exclure,
+    est_assurance, est_syndic, est_casino
 )
 
 # Charger les paiements au démarrage
 PAIEMENTS = load_paiements_excel()
 
+
+class OrjsonJSONProvider(DefaultJSONProvider):
+    """
+    Provider JSON Flask basé sur orjson (encodeur natif).
+
+    Mêmes conventions que le provider par défaut: clés triées, dates au
+    format HTTP (via `default`), sortie compacte hors debug. Les appels avec
+    des options propres à json.dumps/json.loads passent par la stdlib.
+
+    Ce qu'orjson refuse repasse par la stdlib, qui garde alors son
+    comportement: corps de requête avec NaN/Infinity ou entiers de plus de
+    64 bits (loads), entiers de plus de 64 bits à encoder (dumps/response).
+    Seule différence: un float NaN/Infinity est encodé `null` (la stdlib
+    écrit NaN, qui n'est pas du JSON valide).
+    """
+
+    # Datetimes renvoyées à `default` (format HTTP comme le provider stdlib)
+    options = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME if orjson else 0
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        try:
+            return orjson.dumps(obj, default=self.default, option=self.options).decode()
+        except orjson.JSONEncodeError:
+            return super().dumps(obj)
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        try:
+            return orjson.loads(s)
+        except orjson.JSONDecodeError:
+            # NaN/Infinity, grands entiers...: la stdlib accepte, ou lève
+            # la même erreur qu'avant pour un JSON vraiment invalide
+            return super().loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        option = self.options | orjson.OPT_APPEND_NEWLINE
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            option |= orjson.OPT_INDENT_2
+        try:
+            corps = orjson.dumps(obj, default=self.default, option=option)
+        except orjson.JSONEncodeError:
+            return super().response(*args, **kwargs)
+        # Bytes passés directement à la réponse (pas de décodage en str)
+        return self._app.response_class(corps, mimetype=self.mimetype)
+
+
 app = Flask(__name__)
+if orjson is not None:
+    app.json = OrjsonJSONProvider(app)
 CORS(app, origins=["*"])  # Permettre les requêtes cross-origin
 
-# Configuration
-UPLOAD_FOLDER = tempfile.gettempdir()
+# Prêteurs de la liste complémentaire (même convention que analyser_hybride:
+# un nom présent dans les deux listes est classé complémentaire)
+_PRETEURS_COMPLEMENTAIRES = frozenset(PRETEURS_COMPLEMENTAIRES)
+
+# Mots-clés NSF/découvert dans une description (déjà en majuscules):
+# une seule regex au lieu de quatre recherches `in`
+_RE_NSF_DESCRIPTION = re.compile(r'NSF|INSUFFICIENT|FONDS INSUFF|OVERDRAFT')
+
+
+def source_preteur(nom):
+    """Liste d'origine d'un prêteur retourné par est_preteur()"""
+    if nom in _PRETEURS_COMPLEMENTAIRES:
+        return 'LISTE_COMPLEMENTAIRE'
+    return 'LISTE_OPC'
+
+def flags_nsf(flags):
+    """Vrai si un des flags Inverite d'une transaction mentionne NSF"""
+    # Boucle simple: aucun générateur créé pour le cas courant (aucun flag),
+    # arrêt au premier flag NSF, pas de str() sur les flags déjà en texte
+    for flag in flags:
+        if not isinstance(flag, str):
+            flag = str(flag)
+        if 'nsf' in flag.lower():
+            return True
+    return False
+
+def ecrire_json(chemin, data):
+    """
+    Écrit un fichier JSON UTF-8 compact, de façon atomique
+
+    orjson (si installé) encode directement en octets, écrits en un seul
+    write(). Sinon: json de la stdlib, même sortie compacte (aussi en un write)
+
+    Écriture dans un fichier temporaire du même dossier puis os.replace():
+    un lecteur (get_report, list_reports) voit l'ancien ou le nouveau
+    fichier complet, jamais un fichier tronqué.
+
+    Returns:
+        os.stat_result: stat du fichier écrit (pris avant le replace, donc
+        celui de ce contenu même si un autre worker réécrit le fichier)
+    """
+    if orjson is not None:
+        contenu = orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+    else:
+        contenu = json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+    # Nom unique par processus et par thread (workers gthread)
+    temporaire = f"{chemin}.tmp.{os.getpid()}.{threading.get_ident()}"
+    try:
+        with open(temporaire, 'wb') as f:
+            f.write(contenu)
+            stat = os.fstat(f.fileno())
+        os.replace(temporaire, chemin)
+        return stat
+    except BaseException:
+        try:
+            os.remove(temporaire)
+        except OSError:
+            pass
+        raise
 
 @app.route('/', methods=['GET'])
 def index():
@@ -62,33 +183,22 @@ def analyze():
                 "error": "Aucune donnée JSON fournie"
             }), 400
 
-        # Créer un fichier temporaire avec les données
-        temp_file = os.path.join(UPLOAD_FOLDER, f"inverite_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
-
-        with open(temp_file, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-
-        try:
-            # Analyser le fichier avec la fonction hybride
-            resultat = process_json_file_hybrid(temp_file, PAIEMENTS)
-
-            if resultat is None:
-                return jsonify({
-                    "success": False,
-                    "error": "Erreur lors de l'analyse du fichier"
-                }), 500
+        # Analyser directement les données reçues (sans fichier temporaire)
+        filename = f"inverite_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        resultat = process_json_data_hybrid(data, PAIEMENTS, filename)
 
-            # Retourner les résultats
+        if resultat is None:
             return jsonify({
-                "success": True,
-                "analysis": resultat,
-                "timestamp": datetime.now().isoformat()
-            })
+                "success": False,
+                "error": "Erreur lors de l'analyse du fichier"
+            }), 500
 
-        finally:
-            # Nettoyer le fichier temporaire
-            if os.path.exists(temp_file):
-                os.remove(temp_file)
+        # Retourner les résultats
+        return jsonify({
+            "success": True,
+            "analysis": resultat,
+            "timestamp": datetime.now().isoformat()
+        })
 
     except Exception as e:
         return jsonify({
@@ -125,6 +235,10 @@ def analyze_direct():
         total_depenses = 0
         debt_total = 0
 
+        # Les relevés répètent les mêmes marchands: détection une seule fois
+        # par description distincte
+        detections_par_description = {}
+
         for account in accounts:
             transactions = account.get('transactions', [])
 
@@ -136,22 +250,20 @@ def analyze_direct():
                 debit = float(tx.get('debit') or 0)
                 credit = float(tx.get('credit') or 0)
                 amount = credit - debit  # Positif = entrée, Négatif = sortie
+                montant = debit or credit  # Montant affiché (NSF, prêteurs)
 
                 tx_date = tx.get('date', '')
 
                 # Compter les NSF (chercher dans description ET flags)
                 flags = tx.get('flags', [])
-                is_nsf = ('NSF' in description or
-                          'INSUFFICIENT' in description or
-                          'FONDS INSUFF' in description or
-                          'OVERDRAFT' in description or
-                          any('nsf' in str(f).lower() for f in flags))
+                is_nsf = (_RE_NSF_DESCRIPTION.search(description) is not None or
+                          flags_nsf(flags))
 
                 if is_nsf:
                     nsf_count += 1
                     nsf_details.append({
                         'date': tx_date,
-                        'montant': debit or credit,
+                        'montant': montant,
                         'description': description
                     })
 
@@ -161,25 +273,28 @@ def analyze_direct():
                 if debit > 0:
                     total_depenses += debit
 
-                # Détecter les prêteurs
-                if est_preteur(description):
-                    preteur_info = categoriser_transaction(description)
-                    if preteur_info and preteur_info.get('preteur'):
-                        preteur_nom = preteur_info['preteur']
-                        if preteur_nom not in preteurs_detectes:
-                            preteurs_detectes[preteur_nom] = {
-                                'nom': preteur_nom,
-                                'source': preteur_info.get('source', 'detection'),
-                                'transactions': [],
-                                'total': 0
-                            }
-                        preteurs_detectes[preteur_nom]['transactions'].append({
-                            'date': tx_date,
-                            'amount': debit or credit,
-                            'description': description
-                        })
-                        preteurs_detectes[preteur_nom]['total'] += (debit or credit)
-                        debt_total += (debit or credit)
+                # Détecter les prêteurs: une seule recherche (trie compilé)
+                # par description distincte (déjà en majuscules), qui retourne le nom du prêteur
+                detection = detections_par_description.get(description)
+                if detection is None:
+                    detection = detections_par_description[description] = est_preteur_majuscules(description)
+                est_pret, preteur_nom = detection
+                if est_pret:
+                    preteur = preteurs_detectes.get(preteur_nom)
+                    if preteur is None:
+                        preteur = preteurs_detectes[preteur_nom] = {
+                            'nom': preteur_nom,
+                            'source': source_preteur(preteur_nom),
+                            'transactions': [],
+                            'total': 0
+                        }
+                    preteur['transactions'].append({
+                        'date': tx_date,
+                        'amount': montant,
+                        'description': description
+                    })
+                    preteur['total'] += montant
+                    debt_total += montant
 
         # Extraire revenus depuis payschedules si disponibles
         revenu_from_payschedules = 0
@@ -301,17 +416,21 @@ def check_preteur():
             "error": str(e)
         }), 500
 
+# Listes statiques: corps de la réponse sérialisé une seule fois
+_CORPS_PRETEURS_LIST = app.json.response({
+    "success": True,
+    "total": len(PRETEURS_TOUS),
+    "opc_officiels": len(PRETEURS_OFFICIELS_OPC),
+    "preteurs": PRETEURS_TOUS[:100]  # Limiter pour la réponse
+}).get_data()
+
+
 @app.route('/api/preteurs-list', methods=['GET'])
 def preteurs_list():
     """
     Retourner la liste des prêteurs connus
     """
-    return jsonify({
-        "success": True,
-        "total": len(PRETEURS_TOUS),
-        "opc_officiels": len(PRETEURS_OFFICIELS_OPC),
-        "preteurs": PRETEURS_TOUS[:100]  # Limiter pour la réponse
-    })
+    return app.response_class(_CORPS_PRETEURS_LIST, mimetype=app.json.mimetype)
 
 
 # ============================================
@@ -319,15 +438,42 @@ def preteurs_list():
 # ============================================
 
 DOSSIERS_DIR = os.path.join(os.path.dirname(__file__), 'dossiers-clients')
+RAPPORTS_DIR = os.path.join(os.path.dirname(__file__), 'rapports-cache')
+PEDRO_LOGS_DIR = os.path.join(os.path.dirname(__file__), 'pedro-logs')
 
+# Répertoires de sortie créés une seule fois au démarrage (pas de
+# vérification par requête)
+for _repertoire in (DOSSIERS_DIR, RAPPORTS_DIR, PEDRO_LOGS_DIR):
+    os.makedirs(_repertoire, exist_ok=True)
+
+# Toute suite de caractères hors lettres/chiffres/'-' (y compris '_')
+# devient un seul '_' (\w de re == str.isalnum() plus '_')
+_RE_NOM_ASCII_INTERDIT = re.compile(r'[^A-Za-z0-9-]+')
+_RE_NOM_INTERDIT = re.compile(r'(?:_|[^\w-])+')
+
+
+class _TableSansAccents(dict):
+    """
+    Table str.translate qui retire les marques combinantes (catégorie Mn).
+    Remplie à la demande: chaque caractère n'est classé qu'une seule fois,
+    les suivants sont une simple recherche dans le dict (en C).
+    """
+
+    def __missing__(self, code):
+        valeur = self[code] = None if unicodedata.category(chr(code)) == 'Mn' else code
+        return valeur
+
+
+_SANS_ACCENTS = _TableSansAccents()
+
+@lru_cache(maxsize=4096)
 def sanitize_filename(name):
-    """Nettoyer les noms de fichiers"""
-    import unicodedata
-    name = unicodedata.normalize('NFD', name)
-    name = ''.join(c for c in name if unicodedata.category(c) != 'Mn')
-    name = ''.join(c if c.isalnum() or c in '_-' else '_' for c in name)
-    name = '_'.join(filter(None, name.split('_')))
-    return name.upper()
+    """Nettoyer les noms de fichiers (mémoïsé: mêmes clients d'une requête à l'autre)"""
+    if name.isascii():
+        # Chemin rapide: aucun accent à retirer, NFD ne change rien
+        return _RE_NOM_ASCII_INTERDIT.sub('_', name).strip('_').upper()
+    name = unicodedata.normalize('NFD', name).translate(_SANS_ACCENTS)
+    return _RE_NOM_INTERDIT.sub('_', name).strip('_').upper()
 
 
 @app.route('/api/save-dossier', methods=['POST'])
@@ -347,16 +493,14 @@ def save_dossier():
         if not reference:
             return jsonify({"success": False, "error": "Référence manquante"}), 400
 
-        # Créer le répertoire si nécessaire
-        if not os.path.exists(DOSSIERS_DIR):
-            os.makedirs(DOSSIERS_DIR, exist_ok=True)
+        # Même horodatage pour les métadonnées et l'index
+        horodatage = datetime.now().isoformat()
 
         # Nom du dossier
         folder_name = f"{sanitize_filename(reference)}_{sanitize_filename(prenom)}_{sanitize_filename(nom)}"
         folder_path = os.path.join(DOSSIERS_DIR, folder_name)
 
-        if not os.path.exists(folder_path):
-            os.makedirs(folder_path, exist_ok=True)
+        os.makedirs(folder_path, exist_ok=True)
 
         saved_files = []
 
@@ -364,37 +508,34 @@ def save_dossier():
         if margill_data:
             margill_path = os.path.join(folder_path, 'margill.json')
             margill_data['_metadata'] = {
-                'saved_at': datetime.now().isoformat(),
+                'saved_at': horodatage,
                 'source': 'overwatch-extension-v6',
                 'reference': reference
             }
-            with open(margill_path, 'w', encoding='utf-8') as f:
-                json.dump(margill_data, f, ensure_ascii=False, indent=2)
+            ecrire_json(margill_path, margill_data)
             saved_files.append('margill.json')
 
         # Sauvegarder inverite.json
         if inverite_data:
             inverite_path = os.path.join(folder_path, 'inverite.json')
             inverite_data['_metadata'] = {
-                'saved_at': datetime.now().isoformat(),
+                'saved_at': horodatage,
                 'source': 'overwatch-extension-v6',
                 'reference': reference,
                 'guid': inverite_guid
             }
-            with open(inverite_path, 'w', encoding='utf-8') as f:
-                json.dump(inverite_data, f, ensure_ascii=False, indent=2)
+            ecrire_json(inverite_path, inverite_data)
             saved_files.append('inverite.json')
 
         # Index
         index_path = os.path.join(folder_path, 'index.json')
-        with open(index_path, 'w', encoding='utf-8') as f:
-            json.dump({
-                'reference': reference,
-                'client': {'prenom': prenom, 'nom': nom},
-                'files': saved_files,
-                'created_at': datetime.now().isoformat(),
-                'inverite_guid': inverite_guid
-            }, f, ensure_ascii=False, indent=2)
+        ecrire_json(index_path, {
+            'reference': reference,
+            'client': {'prenom': prenom, 'nom': nom},
+            'files': saved_files,
+            'created_at': horodatage,
+            'inverite_guid': inverite_guid
+        })
 
         print(f"✅ Dossier sauvegardé: {folder_name}")
 
@@ -418,7 +559,8 @@ def pedro_analyze():
         data = request.get_json()
         logs = data.get('logs', [])
         url = data.get('url', '')
-        timestamp = data.get('timestamp', datetime.now().isoformat())
+        maintenant = datetime.now()
+        timestamp = data.get('timestamp', maintenant.isoformat())
 
         print(f"🐻 Pedro reçoit {len(logs)} lignes de log")
         print(f"   URL: {url}")
@@ -428,13 +570,8 @@ def pedro_analyze():
         successes = [log for log in logs if '[+]' in log]
 
         # Sauvegarder le log
-        logs_dir = os.path.join(os.path.dirname(__file__), 'pedro-logs')
-        if not os.path.exists(logs_dir):
-            os.makedirs(logs_dir, exist_ok=True)
-
-        log_file = os.path.join(logs_dir, f"pedro_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
-        with open(log_file, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        log_file = os.path.join(PEDRO_LOGS_DIR, f"pedro_{maintenant.strftime('%Y%m%d_%H%M%S')}.json")
+        ecrire_json(log_file, data)
 
         return jsonify({
             "success": True,
@@ -448,8 +585,50 @@ def pedro_analyze():
         return jsonify({"success": False, "error": str(e)}), 500
 
 
-# Cache en mémoire pour les rapports (simple dict)
-REPORTS_CACHE = {}
+def signature_fichier(stat):
+    """Identifie une version d'un fichier: change à chaque ecrire_json()"""
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+
+class CacheRapports:
+    """
+    Cache mémoire LRU borné pour les rapports
+
+    Les rapports les moins récemment utilisés sont retirés au-delà de
+    `taille_max` (ils restent lisibles depuis rapports-cache/). Verrou:
+    les workers gthread partagent le cache entre threads.
+
+    Chaque rapport est gardé avec la signature du fichier écrit. Le cache
+    est propre à chaque processus gunicorn: si un autre worker réécrit le
+    même id (save-report), la signature du fichier ne correspond plus et
+    get() renvoie None, ce qui force la relecture du fichier.
+    """
+
+    def __init__(self, taille_max):
+        self.taille_max = taille_max
+        self._rapports = OrderedDict()
+        self._verrou = threading.Lock()
+
+    def get(self, report_id, signature):
+        """Rapport en cache s'il correspond encore au fichier, sinon None"""
+        with self._verrou:
+            entree = self._rapports.get(report_id)
+            if entree is None or entree[0] != signature:
+                return None
+            self._rapports.move_to_end(report_id)
+            return entree[1]
+
+    def ajouter(self, report_id, rapport, signature):
+        with self._verrou:
+            self._rapports[report_id] = (signature, rapport)
+            self._rapports.move_to_end(report_id)
+            while len(self._rapports) > self.taille_max:
+                self._rapports.popitem(last=False)
+
+
+# Cache en mémoire pour les rapports (LRU borné)
+TAILLE_CACHE_RAPPORTS = int(os.environ.get('REPORTS_CACHE_SIZE', 1024))
+REPORTS_CACHE = CacheRapports(TAILLE_CACHE_RAPPORTS)
 
 @app.route('/api/analyze-inverite', methods=['POST'])
 def analyze_inverite():
@@ -476,6 +655,9 @@ def analyze_inverite():
         total_depenses = 0
         debt_total = 0
 
+        # Détection une seule fois par description distincte
+        detections_par_description = {}
+
         for account in accounts:
             transactions = account.get('transactions', [])
             total_transactions += len(transactions)
@@ -487,21 +669,19 @@ def analyze_inverite():
                 # INVERITE utilise 'debit'/'credit' pas 'amount'
                 debit = float(tx.get('debit') or 0)
                 credit = float(tx.get('credit') or 0)
+                montant = debit or credit  # Montant affiché (NSF, prêteurs)
                 tx_date = tx.get('date', '')
 
                 # NSF (chercher dans description ET flags)
                 flags = tx.get('flags', [])
-                is_nsf = ('NSF' in description or
-                          'INSUFFICIENT' in description or
-                          'FONDS INSUFF' in description or
-                          'OVERDRAFT' in description or
-                          any('nsf' in str(f).lower() for f in flags))
+                is_nsf = (_RE_NSF_DESCRIPTION.search(description) is not None or
+                          flags_nsf(flags))
 
                 if is_nsf:
                     nsf_count += 1
                     nsf_details.append({
                         'date': tx_date,
-                        'montant': debit or credit,
+                        'montant': montant,
                         'description': description
                     })
 
@@ -511,16 +691,19 @@ def analyze_inverite():
                 if debit > 0:
                     total_depenses += debit
 
-                # Prêteurs
-                if est_preteur(description):
-                    info = categoriser_transaction(description)
-                    if info and info.get('preteur'):
-                        nom = info['preteur']
-                        if nom not in preteurs_detectes:
-                            preteurs_detectes[nom] = {'nom': nom, 'count': 0, 'total': 0}
-                        preteurs_detectes[nom]['count'] += 1
-                        preteurs_detectes[nom]['total'] += (debit or credit)
-                        debt_total += (debit or credit)
+                # Prêteurs: une seule recherche (trie compilé) par description
+                # distincte (déjà en majuscules), qui retourne le nom du prêteur
+                detection = detections_par_description.get(description)
+                if detection is None:
+                    detection = detections_par_description[description] = est_preteur_majuscules(description)
+                est_pret, nom = detection
+                if est_pret:
+                    preteur = preteurs_detectes.get(nom)
+                    if preteur is None:
+                        preteur = preteurs_detectes[nom] = {'nom': nom, 'count': 0, 'total': 0}
+                    preteur['count'] += 1
+                    preteur['total'] += montant
+                    debt_total += montant
 
         # Extraire revenus depuis payschedules/stats
         revenu_from_payschedules = 0
@@ -552,8 +735,9 @@ def analyze_inverite():
         score -= min(nsf_count * 5, 25)
         score = max(score, 0)
 
-        # Générer ID unique
-        report_id = f"RPT_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        # Générer ID unique (même instant que le timestamp du rapport)
+        maintenant = datetime.now()
+        report_id = f"RPT_{maintenant.strftime('%Y%m%d_%H%M%S')}"
 
         # Construire le rapport complet
         report_data = {
@@ -575,7 +759,7 @@ def analyze_inverite():
             "preteurs_detectes": list(preteurs_detectes.values()),
             "nsf_details": nsf_details,
             "alertes": [],
-            "timestamp": datetime.now().isoformat()
+            "timestamp": maintenant.isoformat()
         }
 
         # Ajouter alertes
@@ -594,18 +778,12 @@ def analyze_inverite():
                 "details": nsf_details
             })
 
-        # Sauvegarder dans le cache
-        REPORTS_CACHE[report_id] = report_data
+        # Sauvegarder en fichier JSON, puis dans le cache
+        report_file = os.path.join(RAPPORTS_DIR, f"{report_id}.json")
+        stat = ecrire_json(report_file, report_data)
+        REPORTS_CACHE.ajouter(report_id, report_data, signature_fichier(stat))
         print(f"✅ Rapport {report_id} sauvegardé en cache")
 
-        # Aussi sauvegarder en fichier JSON
-        reports_dir = os.path.join(os.path.dirname(__file__), 'rapports-cache')
-        if not os.path.exists(reports_dir):
-            os.makedirs(reports_dir, exist_ok=True)
-        report_file = os.path.join(reports_dir, f"{report_id}.json")
-        with open(report_file, 'w', encoding='utf-8') as f:
-            json.dump(report_data, f, ensure_ascii=False, indent=2)
-
         return jsonify({
             "success": True,
             "id": report_id,
@@ -625,22 +803,26 @@ def get_report(report_id):
     Récupérer un rapport par son ID
     """
     try:
-        # 1. Chercher dans le cache mémoire
-        if report_id in REPORTS_CACHE:
-            print(f"✅ Rapport {report_id} trouvé en cache mémoire")
-            return jsonify(REPORTS_CACHE[report_id])
-
-        # 2. Chercher dans les fichiers
-        reports_dir = os.path.join(os.path.dirname(__file__), 'rapports-cache')
-        report_file = os.path.join(reports_dir, f"{report_id}.json")
-
-        if os.path.exists(report_file):
-            with open(report_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+        # Le fichier fait foi (il peut avoir été réécrit par un autre worker)
+        report_file = os.path.join(RAPPORTS_DIR, f"{report_id}.json")
+        try:
+            stat = os.stat(report_file)
+        except FileNotFoundError:
+            stat = None
+
+        if stat is not None:
+            # 1. Cache mémoire, si le rapport correspond encore au fichier
+            # (un seul accès: le rapport peut être retiré du cache entre-temps)
+            rapport = REPORTS_CACHE.get(report_id, signature_fichier(stat))
+            if rapport is not None:
+                print(f"✅ Rapport {report_id} trouvé en cache mémoire")
+                return jsonify(rapport)
+
+            # 2. Sinon, le fichier
             print(f"✅ Rapport {report_id} trouvé en fichier")
-            # Remettre en cache
-            REPORTS_CACHE[report_id] = data
-            return jsonify(data)
+            # Le fichier est déjà du JSON: envoyé tel quel, sans parse ni
+            # ré-encodage (sendfile, ETag/Last-Modified pour les 304)
+            return send_file(report_file, mimetype='application/json', conditional=True)
 
         print(f"❌ Rapport {report_id} non trouvé")
         return jsonify({"success": False, "error": "Rapport non trouvé"}), 404
@@ -665,17 +847,10 @@ def save_report():
         if not report_id:
             return jsonify({"success": False, "error": "ID manquant"}), 400
 
-        # Sauvegarder en cache mémoire
-        REPORTS_CACHE[report_id] = report_data
-
-        # Sauvegarder en fichier (persistant)
-        reports_dir = os.path.join(os.path.dirname(__file__), 'rapports-cache')
-        if not os.path.exists(reports_dir):
-            os.makedirs(reports_dir, exist_ok=True)
-
-        report_file = os.path.join(reports_dir, f"{report_id}.json")
-        with open(report_file, 'w', encoding='utf-8') as f:
-            json.dump(report_data, f, ensure_ascii=False, indent=2)
+        # Sauvegarder en fichier (persistant), puis en cache mémoire
+        report_file = os.path.join(RAPPORTS_DIR, f"{report_id}.json")
+        stat = ecrire_json(report_file, report_data)
+        REPORTS_CACHE.ajouter(report_id, report_data, signature_fichier(stat))
 
         print(f"💾 Rapport sauvegardé: {report_id}")
 
@@ -690,51 +865,70 @@ def save_report():
         return jsonify({"success": False, "error": str(e)}), 500
 
 
+def _mtime_entree(entree):
+    """Date de modification d'une entrée scandir (0 si le fichier a disparu)"""
+    try:
+        return entree.stat().st_mtime
+    except OSError:
+        return 0
+
+
 @app.route('/api/reports', methods=['GET'])
 def list_reports():
     """
     Lister tous les rapports sauvegardés
-    GET /api/reports
+    GET /api/reports[?limit=N]
     Returns: { success: true, reports: [...] }
+
+    limit (optionnel): ne lire que les N fichiers écrits le plus récemment
     """
     try:
         reports = []
+        limite = request.args.get('limit', type=int)
+
+        # Lire les fichiers du dossier rapports-cache (scandir: stat mis en
+        # cache par entrée, réutilisé pour le tri et le created_at de repli)
+        if os.path.exists(RAPPORTS_DIR):
+            with os.scandir(RAPPORTS_DIR) as iterateur:
+                entrees = [entree for entree in iterateur if entree.name.endswith('.json')]
+
+            if limite is not None:
+                # Trier avant de lire: seuls les N plus récents sont parsés
+                entrees.sort(key=_mtime_entree, reverse=True)
+                del entrees[max(limite, 0):]
+
+            for entree in entrees:
+                filename = entree.name
+                report_id = filename.replace('.json', '')
+                report_file = entree.path
+
+                try:
+                    # Rapport déjà en mémoire et fichier inchangé depuis
+                    # (pas réécrit par un autre worker): pas de relecture
+                    data = REPORTS_CACHE.get(report_id, signature_fichier(entree.stat()))
+                    if data is None:
+                        data = charger_json(report_file)
+
+                    # Extraire les infos essentielles
+                    client_nom = data.get('client', {}).get('nom', 'Inconnu')
+                    if not client_nom or client_nom == 'Inconnu':
+                        client_nom = data.get('nom', 'Inconnu')
+
+                    created_at = data.get('created_at', '')
+                    if not created_at:
+                        # Utiliser la date de modification du fichier
+                        mtime = entree.stat().st_mtime
+                        created_at = datetime.fromtimestamp(mtime).isoformat()
+
+                    reports.append({
+                        "id": report_id,
+                        "client_nom": client_nom,
+                        "created_at": created_at,
+                        "data": data
+                    })
 
-        # Lire tous les fichiers du dossier rapports-cache
-        reports_dir = os.path.join(os.path.dirname(__file__), 'rapports-cache')
-        if os.path.exists(reports_dir):
-            for filename in os.listdir(reports_dir):
-                if filename.endswith('.json'):
-                    report_id = filename.replace('.json', '')
-                    report_file = os.path.join(reports_dir, filename)
-
-                    try:
-                        with open(report_file, 'r', encoding='utf-8') as f:
-                            data = json.load(f)
-
-                        # Extraire les infos essentielles
-                        client_nom = data.get('client', {}).get('nom', 'Inconnu')
-                        if not client_nom or client_nom == 'Inconnu':
-                            client_nom = data.get('nom', 'Inconnu')
-
-                        created_at = data.get('created_at', '')
-                        if not created_at:
-                            # Utiliser la date de modification du fichier
-                            mtime = os.path.getmtime(report_file)
-                            created_at = datetime.fromtimestamp(mtime).isoformat()
-
-                        reports.append({
-                            "id": report_id,
-                            "client_nom": client_nom,
-                            "created_at": created_at,
-                            "data": data
-                        })
-
-                        # Aussi mettre en cache
-                        REPORTS_CACHE[report_id] = data
-
-                    except Exception as e:
-                        print(f"⚠️ Erreur lecture {filename}: {e}")
+                except Exception as e:
+                    print(f"⚠️ Erreur lecture {filename}: {e}")
 
         # Trier par date (plus récent en premier)
         reports.sort(key=lambda x: x.get('created_at', ''), reverse=True)
@@ -752,7 +946,63 @@ def list_reports():
         return jsonify({"success": False, "error": str(e), "reports": []}), 500
 
 
+def run_tests():
+    """Vérifie que les endpoints d'analyse comptent un prêteur de la liste"""
+
+    print("=" * 70)
+    print("  TESTS API - DETECTION DES PRETEURS")
+    print("=" * 70)
+    print()
+
+    # Un prêteur OPC et un commerce: un seul prêteur attendu
+    releve = {
+        "name": "TEST PRETEURS",
+        "accounts": [{
+            "transactions": [
+                {"date": "2025-01-15", "details": "MONEY MART MONTREAL", "debit": "300"},
+                {"date": "2025-01-16", "details": "TIM HORTONS #6364", "debit": "15"},
+            ]
+        }]
+    }
+    client = app.test_client()
+
+    resultat = client.post('/api/analyze-direct', json=releve).get_json()
+    test_cases = [
+        ("analyze-direct - Money Mart compté", resultat['resume']['preteurs_count'], 1),
+    ]
+
+    resultat = client.post('/api/analyze-inverite', json=releve).get_json()
+    test_cases.append(("analyze-inverite - Money Mart compté", resultat['knockOuts'], 1))
+
+    # Ne pas laisser le rapport de test dans le cache
+    report_file = os.path.join(os.path.dirname(__file__), 'rapports-cache', f"{resultat['id']}.json")
+    if os.path.exists(report_file):
+        os.remove(report_file)
+
+    passed = 0
+    failed = 0
+
+    for test_name, obtenu, attendu in test_cases:
+        if obtenu == attendu:
+            print(f"  [PASS] {test_name}")
+            passed += 1
+        else:
+            print(f"  [FAIL] {test_name}")
+            print(f"         Attendu: {attendu}, Obtenu: {obtenu}")
+            failed += 1
+
+    print()
+    print("=" * 70)
+    print(f"  RESULTATS: {passed} PASS, {failed} FAIL")
+    print("=" * 70)
+
+    return failed == 0
+
+
 if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == "--test":
+        sys.exit(0 if run_tests() else 1)
+
     port = int(os.environ.get('PORT', 5000))
     debug = os.environ.get('FLASK_ENV') == 'development'
     app.run(host='0.0.0.0', port=port, debug=debug)
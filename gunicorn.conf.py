@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+"""
+Configuration Gunicorn - FRICTRAK API
+=====================================
+Chargée automatiquement par `gunicorn app:app` (fichier du dossier courant).
+
+L'analyse d'un relevé est du calcul Python pur (CPU), pas de l'attente I/O:
+des workers gevent n'apporteraient rien. On utilise plusieurs processus pour
+qu'une grosse analyse ne bloque pas les autres requêtes, plus quelques threads
+par processus pour les endpoints légers (health, rapports, dossiers).
+"""
+
+import os
+
+# Processus (Railway/Heroku fixent WEB_CONCURRENCY selon la machine)
+workers = int(os.environ.get("WEB_CONCURRENCY", 2))
+
+# Threads par processus
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS", 4))
+
+# Les gros relevés peuvent dépasser les 30 s par défaut
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 120))
+
+# Charger l'application (listes, regex compilées, grille Excel) une seule
+# fois avant le fork: mémoire partagée entre les workers
+preload_app = True
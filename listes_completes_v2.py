@@ -21,6 +21,9 @@ CONTENU :
 TOTAL : 670 entités identifiées
 """
 
+import re
+from functools import lru_cache
+
 # =============================================================================
 # PRÊTEURS OFFICIELS - OFFICE DE LA PROTECTION DU CONSOMMATEUR
 # =============================================================================
@@ -562,6 +565,116 @@ COMMERCES_SERVICES = [
 # FONCTIONS UTILITAIRES
 # =============================================================================
 
+def _est_caractere_mot(caractere: str) -> bool:
+    """Caractère de mot au sens de \\w (lettre, chiffre ou '_')"""
+    return caractere.isalnum() or caractere == "_"
+
+def _est_frontiere_mot(texte: str, position: int) -> bool:
+    """Équivalent de \\b à une position donnée du texte"""
+    avant = position > 0 and _est_caractere_mot(texte[position - 1])
+    apres = position < len(texte) and _est_caractere_mot(texte[position])
+    return avant != apres
+
+def _motif_trie(termes) -> str:
+    """
+    Regex factorisée en trie: les termes partageant un préfixe ne sont testés
+    qu'une fois par caractère commun (au lieu d'une alternative par terme).
+    À chaque position, la regex retient le plus long terme qui y commence.
+    """
+    trie = {}
+    for terme in termes:
+        noeud = trie
+        for caractere in terme:
+            noeud = noeud.setdefault(caractere, {})
+        noeud[""] = {}  # Fin de terme
+
+    def motif(noeud):
+        branches = [
+            re.escape(caractere) + motif(enfant)
+            for caractere, enfant in sorted(noeud.items())
+            if caractere
+        ]
+        if not branches:
+            return ""
+        if "" in noeud:
+            # Fin de terme possible: suite optionnelle (gloutonne = plus long)
+            return "(?:" + "|".join(branches) + ")?"
+        if len(branches) == 1:
+            return branches[0]
+        return "(?:" + "|".join(branches) + ")"
+
+    return motif(trie)
+
+class _DetecteurTermes:
+    """
+    Détecteur multi-termes compilé une seule fois au chargement du module.
+
+    Retourne le même terme qu'une boucle `for terme in termes: if terme in texte`
+    (premier terme de la liste présent dans le texte), mais en une seule passe
+    regex au lieu d'une recherche par terme:
+
+    1. Une regex de tous les termes (factorisée en trie) sert de filtre:
+       la plupart des descriptions ne contiennent aucun terme.
+    2. Sinon, une recherche anticipée (?=...) donne, à chaque position, le plus
+       long terme qui y commence. Tous les autres termes présents à cette
+       position en sont des préfixes, précalculés par rang dans la liste.
+    """
+
+    def __init__(self, termes: list, termes_word_boundary=()):
+        # Rang = position dans la liste (priorité de la boucle d'origine)
+        self.rangs = {}
+        for rang, terme in enumerate(termes):
+            self.rangs.setdefault(terme, rang)
+
+        word_boundary = frozenset(termes_word_boundary)
+        uniques = list(self.rangs)
+        self._word_boundary_actif = not word_boundary.isdisjoint(uniques)
+        # Un texte plus court que le plus court des termes n'en contient aucun
+        self._longueur_min = min(map(len, uniques), default=0)
+        motif = _motif_trie(uniques)
+        self._re_present = re.compile(motif)
+        self._re_positions = re.compile("(?=(" + motif + "))")
+
+        # Pour chaque terme: (rang, préfixe, word boundary) des termes préfixes
+        self._prefixes = {}
+        for terme in uniques:
+            prefixes = [
+                (self.rangs[terme[:fin]], terme[:fin], terme[:fin] in word_boundary)
+                for fin in range(1, len(terme) + 1)
+                if terme[:fin] in self.rangs
+            ]
+            self._prefixes[terme] = sorted(prefixes)
+
+    def contient(self, texte: str) -> bool:
+        """Vrai si un terme est présent (sans chercher lequel)"""
+        if self._word_boundary_actif:
+            return bool(self.premier(texte))
+        return len(texte) >= self._longueur_min and self._re_present.search(texte) is not None
+
+    def premier(self, texte: str) -> str:
+        """Premier terme (ordre de la liste) présent dans le texte, sinon ''"""
+        if len(texte) < self._longueur_min or not self._re_present.search(texte):
+            return ""
+
+        meilleur_rang = len(self.rangs)
+        meilleur_terme = ""
+        for match in self._re_positions.finditer(texte):
+            debut = match.start()
+            for rang, terme, word_boundary in self._prefixes[match.group(1)]:
+                if rang >= meilleur_rang:
+                    break
+                if word_boundary and not (
+                    _est_frontiere_mot(texte, debut)
+                    and _est_frontiere_mot(texte, debut + len(terme))
+                ):
+                    continue
+                meilleur_rang = rang
+                meilleur_terme = terme
+                break
+        return meilleur_terme
+
+_DETECTEUR_PRETEURS = _DetecteurTermes(PRETEURS_TOUS)
+
 def est_preteur(description: str) -> tuple[bool, str]:
     """
     Vérifie si une transaction correspond à un prêteur
@@ -572,26 +685,54 @@ def est_preteur(description: str) -> tuple[bool, str]:
     Returns:
         (est_preteur, nom_preteur)
     """
-    desc_upper = description.upper()
-    for preteur in PRETEURS_TOUS:
-        if preteur in desc_upper:
-            return (True, preteur)
+    return est_preteur_majuscules(description.upper())
+
+def est_preteur_majuscules(desc_upper: str) -> tuple[bool, str]:
+    """
+    Comme est_preteur(), pour une description déjà en majuscules
+    (évite un second upper() quand l'appelant l'a déjà calculé)
+    """
+    preteur = _DETECTEUR_PRETEURS.premier(desc_upper)
+    if preteur:
+        return (True, preteur)
     return (False, "")
 
-import re
+def contient_preteur_majuscules(desc_upper: str) -> bool:
+    """
+    Comme est_preteur_majuscules(), quand seule la réponse oui/non compte
+    (pas de recherche du nom du prêteur)
+    """
+    return _DETECTEUR_PRETEURS.contient(desc_upper)
 
 # Termes courts qui nécessitent un word boundary (éviter faux positifs)
-TERMES_WORD_BOUNDARY = ["SAI", "LIT", "ARCH", "AIG"]
-
-def _match_avec_word_boundary(terme: str, texte: str) -> bool:
-    """Vérifie si un terme matche avec word boundary (mot complet)"""
-    if terme in TERMES_WORD_BOUNDARY:
-        # Pour les termes courts, exiger un word boundary
-        pattern = r'\b' + re.escape(terme) + r'\b'
-        return bool(re.search(pattern, texte))
-    else:
-        # Pour les autres termes, recherche simple
-        return terme in texte
+TERMES_WORD_BOUNDARY = frozenset({"SAI", "LIT", "ARCH", "AIG"})
+
+# Détecteurs des listes d'exclusion (une passe regex par liste au lieu d'une
+# recherche par terme). Assurances et syndics: les termes courts exigent un
+# word boundary (équivalent de \bTERME\b)
+_DETECTEUR_ASSURANCES = _DetecteurTermes(ASSURANCES_TOUTES, TERMES_WORD_BOUNDARY)
+_DETECTEUR_SYNDICS = _DetecteurTermes(SYNDICS_TOUS, TERMES_WORD_BOUNDARY)
+_DETECTEUR_CASINOS = _DetecteurTermes(CASINOS_JEUX)
+_DETECTEUR_COMMERCES = _DetecteurTermes(COMMERCES_SERVICES)
+
+# Toutes les exclusions en un seul détecteur, dans l'ordre de priorité
+# d'est_a_exclure(): le premier terme (rang le plus bas) est une assurance si
+# une assurance est présente, sinon un syndic, etc. Un terme présent dans
+# plusieurs listes garde la première catégorie. Les termes à word boundary
+# ne figurent que dans les assurances et syndics.
+_LISTES_EXCLUSION = (
+    ("assurance", ASSURANCES_TOUTES),
+    ("syndic", SYNDICS_TOUS),
+    ("casino", CASINOS_JEUX),
+    ("commerce", COMMERCES_SERVICES),
+)
+_RAISON_EXCLUSION = {}
+for _raison, _termes in _LISTES_EXCLUSION:
+    for _terme in _termes:
+        _RAISON_EXCLUSION.setdefault(_terme, _raison)
+_DETECTEUR_EXCLUSIONS = _DetecteurTermes(
+    [terme for _, termes in _LISTES_EXCLUSION for terme in termes], TERMES_WORD_BOUNDARY
+)
 
 def est_assurance(description: str) -> tuple[bool, str]:
     """
@@ -603,10 +744,9 @@ def est_assurance(description: str) -> tuple[bool, str]:
     Returns:
         (est_assurance, nom_assurance)
     """
-    desc_upper = description.upper()
-    for assurance in ASSURANCES_TOUTES:
-        if _match_avec_word_boundary(assurance, desc_upper):
-            return (True, assurance)
+    assurance = _DETECTEUR_ASSURANCES.premier(description.upper())
+    if assurance:
+        return (True, assurance)
     return (False, "")
 
 def est_syndic(description: str) -> tuple[bool, str]:
@@ -619,10 +759,9 @@ def est_syndic(description: str) -> tuple[bool, str]:
     Returns:
         (est_syndic, nom_syndic)
     """
-    desc_upper = description.upper()
-    for syndic in SYNDICS_TOUS:
-        if _match_avec_word_boundary(syndic, desc_upper):
-            return (True, syndic)
+    syndic = _DETECTEUR_SYNDICS.premier(description.upper())
+    if syndic:
+        return (True, syndic)
     return (False, "")
 
 def est_casino(description: str) -> tuple[bool, str]:
@@ -635,10 +774,9 @@ def est_casino(description: str) -> tuple[bool, str]:
     Returns:
         (est_casino, nom_casino)
     """
-    desc_upper = description.upper()
-    for casino in CASINOS_JEUX:
-        if casino in desc_upper:
-            return (True, casino)
+    casino = _DETECTEUR_CASINOS.premier(description.upper())
+    if casino:
+        return (True, casino)
     return (False, "")
 
 def est_a_exclure(description: str) -> tuple[bool, str, str]:
@@ -651,29 +789,34 @@ def est_a_exclure(description: str) -> tuple[bool, str, str]:
     Returns:
         (doit_exclure, raison, nom)
     """
-    # Vérifier assurances
-    est_ass, nom_ass = est_assurance(description)
-    if est_ass:
-        return (True, "assurance", nom_ass)
-    
-    # Vérifier syndics
-    est_syn, nom_syn = est_syndic(description)
-    if est_syn:
-        return (True, "syndic", nom_syn)
-    
-    # Vérifier casinos
-    est_cas, nom_cas = est_casino(description)
-    if est_cas:
-        return (True, "casino", nom_cas)
-    
-    # Vérifier commerces
-    desc_upper = description.upper()
-    for commerce in COMMERCES_SERVICES:
-        if commerce in desc_upper:
-            return (True, "commerce", commerce)
-    
+    return _a_exclure_majuscules(description.upper())
+
+def _a_exclure_majuscules(desc_upper: str) -> tuple[bool, str, str]:
+    """est_a_exclure() pour une description déjà en majuscules: une seule
+    passe pour assurances, syndics, casinos et commerces (dans cet ordre)"""
+    terme = _DETECTEUR_EXCLUSIONS.premier(desc_upper)
+    if terme:
+        return (True, _RAISON_EXCLUSION[terme], terme)
     return (False, "", "")
 
+@lru_cache(maxsize=65536)
+def _categoriser(description: str) -> tuple[str, str, bool]:
+    """(type, nom, doit_exclure) d'une description (mémoïsé: les relevés
+    répètent souvent les mêmes marchands)"""
+    desc_upper = description.upper()
+
+    # Vérifier prêteurs d'abord
+    est_pret, nom_pret = est_preteur_majuscules(desc_upper)
+    if est_pret:
+        return ('preteur', nom_pret, False)
+
+    # Vérifier exclusions
+    doit_exclure, raison, nom = _a_exclure_majuscules(desc_upper)
+    if doit_exclure:
+        return (raison, nom, True)
+
+    return ('inconnu', '', False)
+
 def categoriser_transaction(description: str) -> dict:
     """
     Catégorise complètement une transaction
@@ -688,17 +831,10 @@ def categoriser_transaction(description: str) -> dict:
             'doit_exclure': bool
         }
     """
-    # Vérifier prêteurs d'abord
-    est_pret, nom_pret = est_preteur(description)
-    if est_pret:
-        return {'type': 'preteur', 'nom': nom_pret, 'doit_exclure': False}
-    
-    # Vérifier exclusions
-    doit_exclure, raison, nom = est_a_exclure(description)
-    if doit_exclure:
-        return {'type': raison, 'nom': nom, 'doit_exclure': True}
-    
-    return {'type': 'inconnu', 'nom': '', 'doit_exclure': False}
+    # Nouveau dict à chaque appel: l'appelant peut le modifier sans
+    # toucher au cache
+    type_, nom, doit_exclure = _categoriser(description)
+    return {'type': type_, 'nom': nom, 'doit_exclure': doit_exclure}
 
 # =============================================================================
 # TESTS DE VALIDATION